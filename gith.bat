@@ -1,2 +1,2 @@
 @echo off
-python "%~dp0/gith.py" %*
\ No newline at end of file
+python "%~dp0/gith_client.py" %*
\ No newline at end of file
@@ -3,14 +3,118 @@ import argparse
 import subprocess
 import configparser
 import re
-from typing import IO, NoReturn
+from typing import IO, NoReturn, Callable
+from dataclasses import dataclass
+from abc import ABC, abstractmethod
 import time
 import platform
-import pyautogui
-import pytesseract
+import tempfile
+import shutil
+import stat
+import json
+import hashlib
+import threading
+import codecs
+from collections import deque, OrderedDict
+import sys
+import contextlib
+import io
+import functools
+import shlex
+import socket
+import signal
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
 GITH_CONFIG_FILE = os.path.expanduser("~/.githconfig")
+GITH_STATE_DIR = os.path.expanduser("~/.gith")
+SLN_INDEX_FILE = "sln_index.json"
+OCR_REGIONS_FILE = "ocr_regions.json"
+TRASH_DIR_NAME = "gith-trash"
+OCR_TEMPLATE_DIR = "ocr_templates"
+
+# Text vs-build waits for: the status bar once a solution loads, then the Build menu entries
+VS_MENU_TEXTS = ("Debugger", "Compile", "Distributed")
+
+# gen_proj script and arguments for each platform `gith build` supports
+MC_PLATFORM_BUILDS = {
+    "win32": ("win32_renderdragon_x64.py", ["--config", "Release", "--build"]),
+    "uwp": ("uwp_renderdragon_x64_win10.py", ["--config", "Release", "--build"]),
+    "android": ("android_ogl_arm64-v8a_google.py", ["--config", "Release", "--build", "--package"]),
+}
+
+# Output that marks the start of each later build phase, builds start in the generate phase
+BUILD_PHASES = ("generate", "compile", "package")
+BUILD_PHASE_PATTERNS = {
+    # An msbuild or ninja command line, or the banner they print, gen_proj itself prints lines like "Building project files"
+    "compile": r"^\s*(\"[^\"]*[\\/]|\S*[\\/])?(msbuild|ninja)(\.exe)?\"?(\s|$)|^\s*(MSBuild version|Microsoft \(R\) Build Engine|ninja: Entering directory)",
+    "package": r"(?<!-)\b(packaging|signing)\b",
+}
+BUILD_CORES_PER_JOB = 8
+BUILD_MEMORY_GB_PER_JOB = 8
+
+# Folders that never hold a generated solution, skipped when indexing. Platform and configuration folders such as x64 or Release can hold one
+SLN_SKIP_DIRS = {".git", ".vs", "obj", "CMakeFiles", "node_modules", ".gradle", "intermediates"}
 SHORTCUT_PREFIX = "^#short"
+# String shortcuts containing any of these still run through the shell
+SHELL_METACHARACTERS = set("&|;<>()$`%!*?~\n")
+
+# Fetches are only aborted when git stops reporting progress for this many seconds
+FETCH_INACTIVITY_TIMEOUT = 120
+# Longest a git command that prints no progress, such as status, ls-files or clean, may take
+GIT_COMMAND_TIMEOUT = 600
+# Each parallel submodule update and its cache update is killed after this many seconds, even while making progress
+SUBMODULE_UPDATE_TIMEOUT = 550
+
+# Background prefetch, see `gith prefetch`
+PREFETCH_PID_FILE = "prefetch.pid"
+PREFETCH_STATE_FILE = "prefetch.json"
+PREFETCH_INTERVAL_MINUTES = 5
+
+# Seconds a gith process waits for another one to finish writing ~/.githconfig
+CONFIG_LOCK_TIMEOUT = 10
+
+# Per profile options that can be changed with `gith option`
+PROFILE_OPTIONS = {
+    "fetch_filter": "partial clone filter used when fetching, e.g. blob:none",
+    "fetch_depth": "shallow fetch depth",
+    "fetch_prune": "set to false to keep tracking branches that were deleted on the remote",
+    "submodule_jobs": "number of submodules to update at once (core count by default)",
+    "submodule_cache": "directory of shared object caches that submodule clones borrow from",
+    "clean_mode": "full, fast, trash or incremental, used by clean, fetch and branch (full by default)",
+    "branch_mode": "set to worktree to give each branch its own worktree instead of checking it out",
+    "worktree_dir": "folder new worktrees are created in (<repo>-worktrees by default)",
+}
+
+TIMINGS_HISTORY_FILE = "timings.jsonl"
+
+# gith daemon files in GITH_STATE_DIR, and the trailer that carries the exit code back to gith_client.py
+DAEMON_SOCKET_FILE = "daemon.sock"
+DAEMON_PID_FILE = "daemon.pid"
+DAEMON_EXIT_MARKER = b"\0gith-exit:"
+
+# gith bench fails when a median is this much slower than the baseline
+BENCH_REGRESSION_THRESHOLD = 0.2
+
+# Options converted from strings after parsing, by destination name, so a bad value is reported instead of ignored
+NUMBER_OPTIONS = {"files": int, "submodules": int, "runs": int, "jobs": int, "count": int, "interval": float}
+
+# Parsed ~/.githconfig shared by every command in this invocation, and the values it had on disk when read
+_config_store = {"config": None, "mtime": None, "dirty": False, "templates": {}, "base": {}}
+
+# Shortcut macro values, resolved at most once per shortcut stage
+_template_values = {}
+
+# Built once, the daemon keeps it for every request
+_arg_parser = None
+
+# Git and common dir of each repo path, these don't move while gith runs
+_git_dirs_cache = {}
+
+# Timed steps and subprocesses of this invocation, reported by --timings and --trace
+_timing_origin = time.perf_counter()
+_timing_spans = []
+_timing_lock = threading.Lock()
 
 # ======= Custom Classes =======
 class CustomArgumentParser(argparse.ArgumentParser):
@@ -34,8 +138,336 @@ class CustomArgumentParser(argparse.ArgumentParser):
 
         # determine help from format above
         return formatter.format_help()
+
+@dataclass
+class StatusEntry:
+    path: str
+    # Two letter XY state from porcelain v2, "??" for untracked and "!!" for ignored
+    state: str
+    is_submodule: bool = False
+    # Original path of a renamed or copied entry
+    orig_path: str | None = None
+
+@dataclass
+class CommandResult:
+    returncode: int
+    duration: float
+    # Last lines written to stdout and stderr
+    output_tail: list[str]
+    timed_out: bool = False
+
+@dataclass
+class TimingSpan:
+    name: str
+    # "step" for gith functions, "subprocess" for commands they ran
+    category: str
+    # Seconds since gith started
+    start: float
+    duration: float
+    thread_id: int
+    args: dict
+
+class TextDetector(ABC):
+    # Finds a fixed string in a screenshot and returns its (left, top, width, height), or None
+    name = ""
+
+    @abstractmethod
+    def find(self, image, target_text):
+        pass
+
+class TesseractDetector(TextDetector):
+    name = "tesseract"
+
+    def __init__(self, cache_size=64):
+        # OCR results keyed by perceptual hash, identical frames are never sent to Tesseract twice
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def read_words(self, image):
+        cache_key = (image.size, perceptual_hash(image))
+        if cache_key in self.cache:
+            self.cache.move_to_end(cache_key)
+            return self.cache[cache_key]
+
+        import pytesseract
+
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        words = []
+        for index, word in enumerate(data["text"]):
+            if word.strip():
+                words.append((word, (data["left"][index], data["top"][index], data["width"][index], data["height"][index])))
+
+        self.cache[cache_key] = words
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return words
+
+    def find(self, image, target_text):
+        for word, bounds in self.read_words(image):
+            if target_text.lower() in word.lower():
+                return bounds
+
+        return None
+
+class TemplateDetector(TextDetector):
+    # Matches pixel templates of text that Tesseract found before, which takes milliseconds instead of seconds when OpenCV is installed
+    name = "template"
+
+    def __init__(self, template_dir):
+        self.template_dir = template_dir
+        self.templates = {}
+
+    def template_path(self, target_text):
+        return os.path.join(self.template_dir, re.sub(r"[^A-Za-z0-9_-]", "_", target_text.lower()) + ".png")
+
+    def load_template(self, target_text):
+        if target_text not in self.templates:
+            template_path = self.template_path(target_text)
+            template = None
+            if os.path.isfile(template_path):
+                from PIL import Image
+                template = Image.open(template_path)
+                template.load()
+            self.templates[target_text] = template
+
+        return self.templates[target_text]
+
+    def learn(self, image, target_text, bounds, replace=False):
+        # replace is set when the saved template missed text another detector found, so the UI or theme has changed
+        if self.load_template(target_text) is not None and not replace:
+            return
+
+        left, top, width, height = bounds
+        template = image.crop((left, top, left + width, top + height))
+        os.makedirs(self.template_dir, exist_ok=True)
+        template.save(self.template_path(target_text))
+        self.templates[target_text] = template
+
+    def find(self, image, target_text):
+        template = self.load_template(target_text)
+        if template is None or template.width > image.width or template.height > image.height:
+            return None
+
+        # pyscreeze is the image matching library pyautogui uses, calling it directly skips pyautogui's startup
+        import pyscreeze
+
+        # Newer versions of pyscreeze raise instead of returning None when there is no match
+        image_not_found = getattr(pyscreeze, "ImageNotFoundException", OSError)
+        try:
+            box = pyscreeze.locate(template, image, grayscale=True)
+        except (image_not_found, OSError):
+            return None
+
+        return tuple(box) if box else None
+
+class FrameWatcher:
+    # Polls screenshots and only looks for text when the downscaled frame changes, backing off while the screen is idle
+    def __init__(self, screenshot_provider, search_region, detectors=None, min_interval=0.2, max_interval=1.0):
+        self.screenshot_provider = screenshot_provider
+        self.search_region = search_region
+        self.detectors = detectors if detectors is not None else get_default_text_detectors()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.learned_regions = read_state_file(OCR_REGIONS_FILE, {})
+
+    def region_key(self, target_text):
+        return f"{self.search_region[2]}x{self.search_region[3]}|{target_text.lower()}"
+
+    def detect(self, image, target_text):
+        # Detectors are tried cheapest first, a slower detector's hit teaches the template detectors
+        missed_detectors = []
+        for detector in self.detectors:
+            bounds = detector.find(image, target_text)
+            if bounds:
+                for other_detector in self.detectors:
+                    if isinstance(other_detector, TemplateDetector) and other_detector is not detector:
+                        other_detector.learn(image, target_text, bounds, other_detector in missed_detectors)
+                return bounds
+
+            missed_detectors.append(detector)
+
+        return None
+
+    def find_text(self, image, target_text):
+        # Check the band the text was last seen in before searching the whole screen
+        learned_region = self.learned_regions.get(self.region_key(target_text))
+        if learned_region:
+            left, top, width, height = learned_region
+            if self.detect(image.crop((left, top, left + width, top + height)), target_text):
+                return True
+
+        bounds = self.detect(image, target_text)
+        if bounds is None:
+            return False
+
+        # Menus and the status bar keep their vertical position, so remember a full width band around the text
+        _, top, _, height = bounds
+        margin = height * 2
+        self.learned_regions[self.region_key(target_text)] = [0, max(0, top - margin), image.width, height + margin * 2]
+        write_state_file(OCR_REGIONS_FILE, self.learned_regions)
+
+        return True
+
+    def wait_for_text(self, target_text, timeout):
+        start_time = time.monotonic()
+        interval = self.min_interval
+        last_hash = None
+
+        while True:
+            image = self.screenshot_provider(region=self.search_region)
+            frame_hash = perceptual_hash(image)
+
+            if frame_hash != last_hash:
+                last_hash = frame_hash
+                interval = self.min_interval
+                if self.find_text(image, target_text):
+                    return True
+            else:
+                interval = min(interval * 2, self.max_interval)
+
+            if time.monotonic() - start_time + interval > timeout:
+                return False
+
+            time.sleep(interval)
+
+    def capture_hash(self):
+        return perceptual_hash(self.screenshot_provider(region=self.search_region))
+
+    def wait_for_change(self, reference_hash, timeout, poll_interval=0.03):
+        # Returns once the frame differs from the reference and has settled for one poll
+        start_time = time.monotonic()
+        last_hash = reference_hash
+
+        while time.monotonic() - start_time < timeout:
+            frame_hash = self.capture_hash()
+            if frame_hash != reference_hash and frame_hash == last_hash:
+                return True
+
+            last_hash = frame_hash
+            time.sleep(poll_interval)
+
+        return False
+
+@dataclass
+class VsBuildStep:
+    name: str
+    # close_vs, open_solution, move_mouse, hotkey, press or None
+    action: str | None
+    key: str | None = None
+    # What to wait for after the action: frame_change, text, vs_exited or None
+    wait: str | None = "frame_change"
+    text: str | None = None
+    timeout: float = 0.5
+    # Only run the step if this text was found by an earlier "text" wait
+    when: str | None = None
+
+@dataclass
+class TuneSetting:
+    name: str
+    # Smallest preset that includes the setting
+    preset: str
+    # Takes the state from get_tune_state() and returns whether the setting is already in place
+    check: Callable[[dict], bool]
+    # git commands that set it up, run in the repo or submodule
+    apply: list[list[str]]
+    supported: bool = True
+
+class PyAutoGuiBackend:
+    # The UI operations vs-build needs, another backend can stand in for Visual Studio when testing the steps
+    def __init__(self):
+        import pyautogui
+        self.pyautogui = pyautogui
+
+    def screen_size(self):
+        return self.pyautogui.size()
+
+    def screenshot(self, region=None):
+        return self.pyautogui.screenshot(region=region)
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def hotkey(self, key):
+        self.pyautogui.hotkey(key)
+
+    def press(self, key):
+        self.pyautogui.press(key)
+
+    def open_file(self, path):
+        os.startfile(path)
+
+    def close_visual_studio(self):
+        close_visual_studio_windows()
+
+    def visual_studio_running(self):
+        return len(get_visual_studio_pids()) > 0
 # ------- End Custom Classes -------
 
+# Keystrokes that select the Release configuration and start a distributed build if available.
+# Each step waits for something observable, the timeout is the longest it will wait
+VS_BUILD_STEPS = [
+    VsBuildStep("Close Visual Studio", "close_vs", wait="vs_exited", timeout=10),
+    VsBuildStep("Open solution", "open_solution", wait=None),
+    VsBuildStep("Wait for the solution to load", None, wait="text", text=VS_MENU_TEXTS[0], timeout=180),
+    VsBuildStep("Move mouse", "move_mouse", wait=None),
+
+    # Select the release configuration from the Build menu
+    VsBuildStep("Open menu bar", "hotkey", "alt"),
+    VsBuildStep("Open Build menu", "hotkey", "b"),
+    VsBuildStep("Look for Compile", None, wait="text", text=VS_MENU_TEXTS[1], timeout=3),
+    VsBuildStep("Move to Configuration Manager", "press", "up"),
+    VsBuildStep("Skip Compile entries", "press", "up", when=VS_MENU_TEXTS[1]),
+    VsBuildStep("Skip Compile entries", "press", "up", when=VS_MENU_TEXTS[1]),
+    VsBuildStep("Open Configuration Manager", "press", "enter"),
+    VsBuildStep("Select configuration", "press", "down"),
+    VsBuildStep("Select Release", "press", "down"),
+    VsBuildStep("Close configuration list", "press", "escape"),
+    VsBuildStep("Close Configuration Manager", "press", "escape"),
+    VsBuildStep("Close menu", "press", "escape"),
+
+    # Start a distributed build, or a normal build if it isn't available
+    VsBuildStep("Open menu bar", "hotkey", "alt"),
+    VsBuildStep("Open Build menu", "hotkey", "b"),
+    VsBuildStep("Look for Distributed", None, wait="text", text=VS_MENU_TEXTS[2], timeout=3),
+    VsBuildStep("Move to distributed build", "press", "down", when=VS_MENU_TEXTS[2]),
+    VsBuildStep("Move to distributed build", "press", "down", when=VS_MENU_TEXTS[2]),
+    VsBuildStep("Move to distributed build", "press", "down", when=VS_MENU_TEXTS[2]),
+    VsBuildStep("Start build", "press", "enter"),
+]
+
+# Git features `gith tune` checks and turns on, safe only changes repo config and files, full also starts background processes
+TUNE_PRESETS = ("safe", "full")
+TUNE_SETTINGS = [
+    TuneSetting("commit-graph", "safe",
+                lambda state: os.path.exists(os.path.join(state["objects_dir"], "info", "commit-graph")) or os.path.isdir(os.path.join(state["objects_dir"], "info", "commit-graphs")),
+                [["commit-graph", "write", "--reachable", "--changed-paths"]]),
+    TuneSetting("fetch.writeCommitGraph", "safe",
+                lambda state: state["config"].get("fetch.writecommitgraph") == "true",
+                [["config", "fetch.writeCommitGraph", "true"]]),
+    # Repos with only loose objects have no packs to index
+    TuneSetting("multi-pack-index", "safe",
+                lambda state: state["pack_count"] == 0 or os.path.exists(os.path.join(state["objects_dir"], "pack", "multi-pack-index")),
+                [["multi-pack-index", "write"]]),
+    TuneSetting("feature.manyFiles", "safe",
+                lambda state: state["config"].get("feature.manyfiles") == "true",
+                [["config", "feature.manyFiles", "true"]]),
+    TuneSetting("index v4", "safe",
+                lambda state: state["index_version"] == 4,
+                [["update-index", "--index-version", "4"]]),
+    TuneSetting("untracked cache", "safe",
+                lambda state: state["config"].get("core.untrackedcache") == "true",
+                [["config", "core.untrackedCache", "true"], ["update-index", "--untracked-cache"]]),
+    # The built in fsmonitor daemon only exists on Windows and macOS
+    TuneSetting("fsmonitor", "full",
+                lambda state: state["config"].get("core.fsmonitor") == "true",
+                [["config", "core.fsmonitor", "true"]],
+                platform.system() in ("Windows", "Darwin")),
+    TuneSetting("maintenance", "full",
+                lambda state: state["path"] in state["maintenance_repos"],
+                [["maintenance", "start"]]),
+]
+
 # ======= Configuration File Functions =======
 def clean_path(path):
     path = path.replace('"', '')
@@ -44,6 +476,11 @@ def clean_path(path):
     return path
 
 def get_current_profile():
+    # `gith all` pins each child process to a profile
+    env_profile = os.environ.get("GITH_PROFILE")
+    if env_profile:
+        return env_profile
+
     config = read_gith_config()
     if config.has_option("default", "current_profile"):
         return config.get("default", "current_profile")
@@ -52,8 +489,7 @@ def get_current_profile():
 def set_current_profile(profile_name):
     config = read_gith_config()
     config.set("default", "current_profile", profile_name)
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
 def delete_profile():
     config = read_gith_config()
@@ -69,8 +505,7 @@ def delete_profile():
 
     config.remove_section(profile_name)
 
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
     
     if get_current_profile() == profile_name:
         set_current_profile("default")
@@ -95,8 +530,7 @@ def set_repo_path(repo_path):
     config.set(current_profile, "repo_path", str(repo_path))
 
     # Write the updated config
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
 def get_branch_name():
     config = read_gith_config()
@@ -125,8 +559,7 @@ def set_branch_name(branch_name):
     config.set(current_profile, "branch_name", str(branch_name))
 
     # Write the updated config
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
     
     print(f"Main branch set to: {branch_name}")
 
@@ -157,8 +590,7 @@ def set_remote_name(remote_name):
     config.set(current_profile, "remote_name", str(remote_name))
 
     # Write the updated config
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
     print(f"Remote set to: {remote_name}")
 
@@ -172,385 +604,2229 @@ def delete_remote_name():
 
     config.remove_option(current_profile, "remote_name")
 
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
     print(f"Deleted remote for the '{current_profile}' profile")
+
+def get_profile_option(option_name, default=""):
+    config = read_gith_config()
+    current_profile = get_current_profile()
+
+    if config.has_option(current_profile, option_name):
+        return config.get(current_profile, option_name)
+
+    return default
+
+def profile_option_command(option_name, value):
+    current_profile = get_current_profile()
+
+    if option_name == "":
+        print(f"Options for the '{current_profile}' profile:")
+        for name, description in PROFILE_OPTIONS.items():
+            print(f"{name} = {get_profile_option(name, 'not set')}    ({description})")
+        return
+
+    if option_name not in PROFILE_OPTIONS:
+        print(f"Error: '{option_name}' is not a known option, choose between ({', '.join(PROFILE_OPTIONS)})")
+        return
+
+    config = read_gith_config()
+
+    if not config.has_section(current_profile):
+        config.add_section(current_profile)
+
+    if value == "":
+        config.remove_option(current_profile, option_name)
+        print(f"Cleared option '{option_name}' for the '{current_profile}' profile")
+    else:
+        config.set(current_profile, option_name, value)
+        print(f"Set option '{option_name}' to '{value}' for the '{current_profile}' profile")
+
+    write_gith_config(config)
 # ------- End Configuration File Functions -------
 
-# ======= Helpers =======
-def run_git_command(args, timeout=50, max_retries=3):
-    args = ["git"] + args
-    output = run_command(args, timeout, max_retries)
-    if (output == "^#FAILURE^#"):
-        return False
-    
-    if "CONFLICT" in output:
-        print("Error: a conflict occured during git command execution, please resolve before proceeding")
-        return False
+# ======= Helpers =======
+@contextlib.contextmanager
+def timed_span(name, category="step", **span_args):
+    start_time = time.perf_counter()
+    try:
+        yield span_args
+    finally:
+        record_timing_span(name, category, start_time, span_args)
+
+def record_timing_span(name, category, start_time, span_args=None):
+    # Spans keep their thread, so parallel submodule work shows up on its own track in the trace
+    span = TimingSpan(name, category, start_time - _timing_origin, time.perf_counter() - start_time, threading.get_ident(), span_args or {})
+    with _timing_lock:
+        _timing_spans.append(span)
+
+def timed_step(function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with timed_span(function.__name__):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+def get_timing_totals():
+    # Total time per step name, in the order each step first started
+    totals = {}
+    for span in sorted(_timing_spans, key=lambda span: span.start):
+        total = totals.setdefault(span.name, {"category": span.category, "calls": 0, "total": 0.0, "max": 0.0})
+        total["calls"] += 1
+        total["total"] += span.duration
+        total["max"] = max(total["max"], span.duration)
+
+    return totals
+
+def print_timings_table(totals, command_duration):
+    print(f"\n{'Step':<60} {'Calls':>5} {'Total':>9} {'Max':>9} {'Share':>6}")
+    for name, total in sorted(totals.items(), key=lambda item: item[1]["total"], reverse=True):
+        short_name = name if len(name) <= 60 else name[:57] + "..."
+        share = total["total"] / command_duration * 100 if command_duration else 0
+        print(f"{short_name:<60} {total['calls']:>5} {total['total']:>8.2f}s {total['max']:>8.2f}s {share:>5.0f}%")
+    print(f"{'Command total':<60} {'':>5} {command_duration:>8.2f}s")
+
+def write_timing_trace(trace_path):
+    # Chrome trace event format, open it in chrome://tracing or https://ui.perfetto.dev
+    pid = os.getpid()
+    thread_ids = {}
+    events = []
+    for span in sorted(_timing_spans, key=lambda span: span.start):
+        tid = thread_ids.setdefault(span.thread_id, len(thread_ids))
+        events.append({"name": span.name, "cat": span.category, "ph": "X", "ts": round(span.start * 1e6), "dur": round(span.duration * 1e6), "pid": pid, "tid": tid, "args": span.args})
+
+    try:
+        with open(trace_path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"\nTrace written to {trace_path}")
+    except OSError as e:
+        print(f"Error: Unable to write trace file {trace_path}: {e}")
+
+def record_timing_history(command_name, command_line, command_duration, totals):
+    # One JSON line per command run, so slow steps can be compared over time
+    entry = {
+        "time": time.time(),
+        "command": command_name,
+        "argv": command_line,
+        "profile": get_current_profile(),
+        "duration": round(command_duration, 3),
+        "steps": {name: round(total["total"], 3) for name, total in totals.items()},
+    }
+
+    try:
+        os.makedirs(GITH_STATE_DIR, exist_ok=True)
+        with open(os.path.join(GITH_STATE_DIR, TIMINGS_HISTORY_FILE), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+    except OSError as e:
+        print(f"Error: Unable to record timings: {e}")
+
+def report_timings(command_name, command_line, command_duration, show_table=False, trace_path=None):
+    if not _timing_spans:
+        return
+
+    totals = get_timing_totals()
+    record_timing_history(command_name, command_line, command_duration, totals)
+
+    if show_table:
+        print_timings_table(totals, command_duration)
+
+    if trace_path:
+        write_timing_trace(trace_path)
+
+def read_timing_history():
+    history = []
+    try:
+        with open(os.path.join(GITH_STATE_DIR, TIMINGS_HISTORY_FILE)) as f:
+            for line in f:
+                try:
+                    history.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+
+    return history
+
+def run_git_command(args, timeout=50, max_retries=3, stdin=None):
+    args = ["git"] + args
+    result = run_command(args, timeout, max_retries, stdin=stdin)
+    if result.timed_out:
+        return False
+
+    if any("CONFLICT" in line for line in result.output_tail):
+        print("Error: a conflict occured during git command execution, please resolve before proceeding")
+        return False
+
+    return result.returncode == 0
+
+def read_state_file(file_name, default=None):
+    try:
+        with open(os.path.join(GITH_STATE_DIR, file_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def write_state_file(file_name, data):
+    # Same temp file and swap approach as flush_gith_config(), so readers never see a partial file
+    os.makedirs(GITH_STATE_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{file_name}.", dir=GITH_STATE_DIR, text=True)
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_path, os.path.join(GITH_STATE_DIR, file_name))
+    except OSError as e:
+        print(f"Error: Unable to write {file_name}: {e}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def scan_sln_dirs(directory, cached_dirs):
+    # Directories whose mtime is unchanged reuse their cached listing instead of being scanned again
+    scanned_dirs = {}
+    pending_dirs = [directory]
+
+    while pending_dirs:
+        path = pending_dirs.pop()
+        mtime = get_mtime(path)
+        if mtime is None:
+            continue
+
+        entry = cached_dirs.get(path)
+        if not entry or entry["mtime"] != mtime:
+            entry = {"mtime": mtime, "slns": [], "subdirs": []}
+            try:
+                with os.scandir(path) as dir_entries:
+                    for dir_entry in dir_entries:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            if dir_entry.name not in SLN_SKIP_DIRS:
+                                entry["subdirs"].append(dir_entry.path)
+                        elif dir_entry.name.endswith(".sln"):
+                            entry["slns"].append(dir_entry.path)
+            except OSError:
+                continue
+
+        scanned_dirs[path] = entry
+        pending_dirs.extend(entry["subdirs"])
+
+    return scanned_dirs
+
+def find_sln_file(directory):
+    directory = os.path.abspath(directory)
+    sln_index = read_state_file(SLN_INDEX_FILE, {})
+    index_key = f"{get_current_profile()}|{directory}"
+    index_entry = sln_index.get(index_key, {})
+
+    # Listings made with a different skip list may be missing folders
+    skip_dirs = sorted(SLN_SKIP_DIRS)
+    cached_dirs = index_entry.get("dirs", {}) if index_entry.get("skip_dirs") == skip_dirs else {}
+
+    # Every folder is checked with a stat, only the ones that changed are listed again
+    scanned_dirs = scan_sln_dirs(directory, cached_dirs)
+    if scanned_dirs != cached_dirs:
+        sln_index[index_key] = {"dirs": scanned_dirs, "skip_dirs": skip_dirs}
+        write_state_file(SLN_INDEX_FILE, sln_index)
+
+    # Pick the most recently generated solution, ties are broken by path so the choice is stable
+    sln_files = [(get_mtime(sln) or 0, sln) for entry in scanned_dirs.values() for sln in entry["slns"]]
+    return max(sln_files)[1] if sln_files else None
+
+def is_partial_path(path):
+    cwd = os.getcwd()
+    if not os.path.isabs(path):
+        return True
+    if path.startswith(cwd):
+        return True
+    return False
+
+def perceptual_hash(image):
+    # Downscaled and quantized, so a blinking cursor or antialiasing noise doesn't count as a change
+    thumbnail = image.convert("L").resize((max(1, image.width // 8), max(1, image.height // 8)))
+    return hashlib.blake2b(bytes(pixel >> 4 for pixel in thumbnail.tobytes()), digest_size=16).digest()
+
+def get_default_text_detectors():
+    return [TemplateDetector(os.path.join(GITH_STATE_DIR, OCR_TEMPLATE_DIR)), TesseractDetector()]
+
+def benchmark_text_detectors(screenshot_dir):
+    try:
+        from PIL import Image
+        import pytesseract
+        import pyscreeze
+    except ImportError as e:
+        print(f"Error: ocr-bench requires Pillow, pytesseract and pyscreeze to be installed, they come with pyautogui ({e})")
+        return
+
+    if not os.path.isdir(screenshot_dir):
+        print(f"Error: '{screenshot_dir}' is not a directory")
+        return
+
+    screenshot_paths = sorted(os.path.join(screenshot_dir, name) for name in os.listdir(screenshot_dir) if name.lower().endswith(".png"))
+    if not screenshot_paths:
+        print(f"Error: No .png screenshots found in '{screenshot_dir}'")
+        return
+
+    screenshots = [Image.open(path) for path in screenshot_paths]
+
+    # Templates are saved in a temporary directory, so the benchmark doesn't change the real ones
+    with tempfile.TemporaryDirectory() as template_dir:
+        tesseract_detector = TesseractDetector()
+        template_detector = TemplateDetector(template_dir)
+
+        print(f"{'Detector':<10}  {'Target':<12}  {'Found':>7}  {'Avg ms':>8}")
+        for detector in (tesseract_detector, template_detector):
+            for target_text in VS_MENU_TEXTS:
+                found_count = 0
+                start_time = time.perf_counter()
+                for screenshot in screenshots:
+                    bounds = detector.find(screenshot, target_text)
+                    if bounds:
+                        found_count += 1
+                        if detector is tesseract_detector:
+                            template_detector.learn(screenshot, target_text, bounds)
+                average_ms = (time.perf_counter() - start_time) * 1000 / len(screenshots)
+                print(f"{detector.name:<10}  {target_text:<12}  {found_count:>3}/{len(screenshots):<3}  {average_ms:>8.1f}")
+
+def get_visual_studio_pids():
+    # Use tasklist to get a list of running processes
+    try:
+        process_list = subprocess.check_output(["tasklist"], text=True)
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        print(f"Error: {e}")
+        return []
+
+    # Find Visual Studio processes
+    return [int(line.split()[1]) for line in process_list.splitlines() if "devenv.exe" in line]
+
+def close_visual_studio_windows():
+    print("Closing Visual Studio windows")
+
+    # Terminate Visual Studio processes
+    for pid in get_visual_studio_pids():
+        try:
+            subprocess.check_output(["taskkill", "/F", "/PID", str(pid)])
+        except subprocess.CalledProcessError as e:
+            print(f"Error: {e}")
+
+def wait_for_condition(condition, timeout, poll_interval=0.1):
+    start_time = time.monotonic()
+    while not condition():
+        if time.monotonic() - start_time > timeout:
+            return False
+        time.sleep(poll_interval)
+
+    return True
+
+def run_vs_build_steps(steps, ui_backend, frame_watcher, sln_file):
+    # Texts found by "text" waits, used by the `when` field of later steps
+    found_texts = {}
+    step_timings = []
+
+    for step in steps:
+        if step.when and not found_texts.get(step.when):
+            continue
+
+        start_time = time.monotonic()
+        reference_hash = frame_watcher.capture_hash() if step.wait == "frame_change" else None
+
+        if step.action == "close_vs":
+            ui_backend.close_visual_studio()
+        elif step.action == "open_solution":
+            ui_backend.open_file(sln_file)
+        elif step.action == "move_mouse":
+            screen_width, screen_height = ui_backend.screen_size()
+            ui_backend.move_to(screen_width * 0.5, screen_height * 0.9)
+        elif step.action == "hotkey":
+            ui_backend.hotkey(step.key)
+        elif step.action == "press":
+            ui_backend.press(step.key)
+
+        if step.wait == "frame_change":
+            frame_watcher.wait_for_change(reference_hash, step.timeout)
+        elif step.wait == "text":
+            found_texts[step.text] = frame_watcher.wait_for_text(step.text, step.timeout)
+        elif step.wait == "vs_exited":
+            wait_for_condition(lambda: not ui_backend.visual_studio_running(), step.timeout)
+
+        step_timings.append((step.name, time.monotonic() - start_time))
+
+    return step_timings
+
+def open_visual_studio_distributed_build(sln_path):
+    # GUI and OCR modules are only imported here so other commands start fast and work on headless machines
+    try:
+        import pyautogui
+        import pytesseract
+    except ImportError as e:
+        print(f"Error: vs-build requires pyautogui and pytesseract to be installed ({e})")
+        return
+
+    sln_file = sln_path
+
+    if is_partial_path(sln_file):
+        sln_file = os.path.join(os.getcwd(), sln_file)
+
+    if sln_path == "" or not os.path.isfile(sln_file) or not sln_file.endswith('.sln'):
+        build_dir = os.path.join(get_repo_path(), 'build')
+        sln_file = find_sln_file(build_dir)
+
+    if not sln_file:
+        print("Error: No .sln file found in the build directory.")
+        return
+
+    ui_backend = PyAutoGuiBackend()
+    screen_width, screen_height = ui_backend.screen_size()
+    frame_watcher = FrameWatcher(ui_backend.screenshot, (0, 0, screen_width, screen_height))
+
+    step_timings = run_vs_build_steps(VS_BUILD_STEPS, ui_backend, frame_watcher, sln_file)
+
+    print("Visual Studio build opened and distributed build configuration selected.")
+    print("\nStep timings:")
+    for step_name, duration in step_timings:
+        print(f"{step_name}: {duration:.2f}s")
+
+def get_available_memory_gb():
+    try:
+        if platform.system() == "Windows":
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong), ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong), ("ullTotalVirtual", ctypes.c_ulonglong),
+                            ("ullAvailVirtual", ctypes.c_ulonglong), ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            memory_status = MemoryStatus()
+            memory_status.dwLength = ctypes.sizeof(MemoryStatus)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(memory_status))
+            return memory_status.ullAvailPhys / 1024 ** 3
+
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 ** 3
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def get_build_job_limit(build_count):
+    # Every build already compiles on all cores, so only run several at once on machines with room for them
+    job_limit = max(1, (os.cpu_count() or 1) // BUILD_CORES_PER_JOB)
+
+    available_memory = get_available_memory_gb()
+    if available_memory is not None:
+        job_limit = min(job_limit, max(1, int(available_memory // BUILD_MEMORY_GB_PER_JOB)))
+
+    return min(job_limit, build_count)
+
+def run_mc_platform_build(mc_platform, generate_and_build_command, log_dir):
+    import logging.handlers
+
+    # Full output goes to a rotating log per platform, only phase changes are printed
+    logger = logging.getLogger(f"gith.build.{mc_platform}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    log_path = os.path.join(log_dir, f"build-{mc_platform}.log")
+    log_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=10 * 1024 ** 2, backupCount=3, encoding="utf-8")
+    log_handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(log_handler)
+
+    phase_times = {"generate": time.monotonic()}
+    current_phase = ["generate"]
+
+    def on_line(line):
+        logger.info(line)
+
+        # Phases only move forward, generate -> compile -> package
+        for phase_name in BUILD_PHASES[BUILD_PHASES.index(current_phase[0]) + 1:]:
+            if re.search(BUILD_PHASE_PATTERNS[phase_name], line, re.IGNORECASE):
+                current_phase[0] = phase_name
+                phase_times[phase_name] = time.monotonic()
+                print(f"[{mc_platform}] {phase_name} started")
+                break
+
+    print(f"[{mc_platform}] generate started, logging to {log_path}")
+    logger.info("Running: " + " ".join(generate_and_build_command))
+
+    result = run_streaming_command(generate_and_build_command, 0, on_line, echo=False, stdin=subprocess.DEVNULL)
+
+    logger.removeHandler(log_handler)
+    log_handler.close()
+
+    # Each phase lasts until the next one starts
+    end_time = time.monotonic()
+    phase_starts = sorted(phase_times.items(), key=lambda phase: phase[1])
+    phase_durations = {}
+    for index, (phase_name, start_time) in enumerate(phase_starts):
+        next_start = phase_starts[index + 1][1] if index + 1 < len(phase_starts) else end_time
+        phase_durations[phase_name] = next_start - start_time
+
+    status = "passed" if result.returncode == 0 else "failed"
+    print(f"[{mc_platform}] {status} in {result.duration:.0f}s")
+
+    return status, phase_durations, result.duration, log_path
+
+def generate_and_build_mc_platforms(mc_platforms, jobs=None):
+    builds = []
+    for mc_platform in mc_platforms:
+        mc_platform = mc_platform.lower()
+        if mc_platform not in MC_PLATFORM_BUILDS:
+            print(f"Error: '{mc_platform}' is not a valid platform, choose between (Win32, UWP and Android)")
+            return
+
+        # Two builds of one platform would write the same build folder and log
+        if any(build[0] == mc_platform for build in builds):
+            continue
+        gen_proj_script, build_args = MC_PLATFORM_BUILDS[mc_platform]
+        builds.append((mc_platform, [sys.executable, os.path.join("gen_proj", gen_proj_script)] + build_args))
+
+    if not jobs or jobs < 1:
+        jobs = get_build_job_limit(len(builds))
+
+    log_dir = os.path.join(GITH_STATE_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    print(f"Building {', '.join(build[0] for build in builds)} with {jobs} at a time")
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(lambda build: run_mc_platform_build(build[0], build[1], log_dir), builds))
+
+    print(f"\n{'Platform':<10}  {'Result':<6}  {'Generate':>9}  {'Compile':>9}  {'Package':>9}  {'Total':>9}")
+    for (mc_platform, _), (status, phase_durations, duration, log_path) in zip(builds, results):
+        phase_columns = "  ".join(f"{phase_durations[phase]:>8.0f}s" if phase in phase_durations else f"{'-':>9}" for phase in BUILD_PHASES)
+        print(f"{mc_platform:<10}  {status:<6}  {phase_columns}  {duration:>8.0f}s")
+
+    for (mc_platform, _), (status, _, _, log_path) in zip(builds, results):
+        if status == "failed":
+            print(f"Error: The {mc_platform} build failed, see {log_path}")
+
+    # The build outputs become the baseline that incremental cleans keep
+    if all(status == "passed" for status, _, _, _ in results):
+        record_clean_manifest()
+
+def run_streaming_command(command, inactivity_timeout=50, on_line=None, echo=True, cwd=None, stdin=None, tail_size=200, timeout=None):
+    start_time = time.monotonic()
+    timing_start = time.perf_counter()
+
+    try:
+        process = subprocess.Popen(command, cwd=cwd or get_repo_path(), stdin=stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except FileNotFoundError:
+        print(f"Error: '{command}' is not valid command, cannot find file")
+        return CommandResult(127, 0.0, [])
+
+    output_tail = deque(maxlen=tail_size)
+    last_activity = [time.monotonic()]
+    line_lock = threading.Lock()
+
+    # Tee each stream to the console as it arrives, and split it into lines for the callback and the tail
+    def read_stream(stream, console):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial_line = ""
+
+        while True:
+            chunk = stream.read1(4096)
+            last_activity[0] = time.monotonic()
+            text = decoder.decode(chunk, final=not chunk)
+
+            if echo and text:
+                console.write(text)
+                console.flush()
+
+            # Progress output rewrites the same line with \r, treat it as a line break
+            lines = re.split(r"[\r\n]", partial_line + text)
+            partial_line = "" if not chunk else lines.pop()
+
+            with line_lock:
+                for line in lines:
+                    if line:
+                        output_tail.append(line)
+                        if on_line:
+                            on_line(line)
+
+            if not chunk:
+                break
+
+    readers = [
+        threading.Thread(target=read_stream, args=(process.stdout, sys.stdout), daemon=True),
+        threading.Thread(target=read_stream, args=(process.stderr, sys.stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    # Block until the command exits or the nearest timeout could expire, polling would round every command up
+    timed_out = False
+    while True:
+        deadlines = []
+        if inactivity_timeout:
+            deadlines.append(last_activity[0] + inactivity_timeout)
+        if timeout:
+            deadlines.append(start_time + timeout)
+
+        wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        try:
+            process.wait(wait_time)
+            break
+        except subprocess.TimeoutExpired:
+            pass
+
+        # Output since the wait started moves the inactivity deadline, so only kill once a deadline really passed
+        now = time.monotonic()
+        if (inactivity_timeout and now - last_activity[0] > inactivity_timeout) or (timeout and now - start_time > timeout):
+            process.kill()
+            timed_out = True
+            break
+
+    process.wait()
+    for reader in readers:
+        reader.join()
+
+    record_timing_span(" ".join(command), "subprocess", timing_start, {"returncode": process.returncode, "timed_out": timed_out})
+
+    return CommandResult(process.returncode, time.monotonic() - start_time, list(output_tail), timed_out)
+
+def run_captured_command(command, input=None, cwd=None, text=True, errors=None, timeout=GIT_COMMAND_TIMEOUT):
+    # For git commands whose output is parsed rather than shown, with the same timeout, timing and errors as
+    # run_streaming_command. The result is a CompletedProcess, a timed out command returns code -1 and no output
+    timing_start = time.perf_counter()
+    empty_output = "" if text else b""
+    encoding = "utf-8" if text and errors else None
+
+    try:
+        result = subprocess.run(command, cwd=cwd or get_repo_path(), input=input, capture_output=True, text=text, encoding=encoding, errors=errors, timeout=timeout)
+    except FileNotFoundError:
+        print(f"Error: '{command}' is not valid command, cannot find file")
+        return subprocess.CompletedProcess(command, 127, empty_output, empty_output)
+    except subprocess.TimeoutExpired:
+        print(f"Error: '{' '.join(command)}' did not finish within {timeout} seconds")
+        record_timing_span(" ".join(command), "subprocess", timing_start, {"returncode": -1, "timed_out": True})
+        return subprocess.CompletedProcess(command, -1, empty_output, empty_output)
+
+    record_timing_span(" ".join(command), "subprocess", timing_start, {"returncode": result.returncode, "timed_out": False})
+    return result
+
+def run_command(command, max_idle_time=50, max_retries=3, on_line=None, stdin=None):
+    retries = 0
+
+    while True:
+        result = run_streaming_command(command, max_idle_time, on_line, stdin=stdin)
+        if not result.timed_out:
+            return result
+
+        if retries >= max_retries:
+            break
+
+        retries += 1
+        print(f"\n\nCommand made no progress for {max_idle_time} seconds. (Attempt {retries}) Retrying...")
+
+    print(f"Command failed after {max_retries} retries.")
+    return result
+
+def get_fetch_filter_args():
+    fetch_args = []
+
+    fetch_filter = get_profile_option("fetch_filter")
+    if fetch_filter:
+        fetch_args.append(f"--filter={fetch_filter}")
+
+    fetch_depth = get_profile_option("fetch_depth")
+    if fetch_depth:
+        fetch_args.append(f"--depth={fetch_depth}")
+
+    return fetch_args
+
+def get_fetch_args(remote_name, branch_name):
+    fetch_args = ["fetch", "--progress"] + get_fetch_filter_args()
+
+    return fetch_args + [remote_name, f"+refs/heads/{branch_name}:refs/remotes/{remote_name}/{branch_name}"]
+
+@timed_step
+def fetch_remote_branch(remote_name, branch_name, inactivity_timeout=FETCH_INACTIVITY_TIMEOUT, max_retries=1):
+    # git reports progress on stderr, so a slow but active fetch is never cut off.
+    # Objects from a background prefetch are already local, so the fetch only transfers what changed since
+    if not run_git_command(get_fetch_args(remote_name, branch_name), inactivity_timeout, max_retries):
+        return False
+
+    # `git remote prune` only lists the remote's branch names, fetching with --prune would need every branch's refspec
+    # and download all of them. A failed prune leaves stale tracking branches behind, it doesn't fail the fetch
+    if get_profile_option("fetch_prune", "true").lower() != "false":
+        print(f"\nRunning 'git remote prune {remote_name}'")
+        if not run_git_command(["remote", "prune", remote_name], inactivity_timeout, max_retries):
+            print(f"Unable to prune the deleted branches of '{remote_name}'")
+
+    return True
+
+def get_git_command(args):
+    repo_path = get_repo_path()
+    return ["git", "-C", repo_path] + args
+
+def find_git_dirs(repo_path):
+    # Returns (git_dir, common_dir) for the repo containing repo_path, worktrees keep their refs in the common dir
+    if repo_path in _git_dirs_cache:
+        return _git_dirs_cache[repo_path]
+
+    git_dirs = (None, None)
+    search_path = os.path.abspath(repo_path)
+    while True:
+        dot_git = os.path.join(search_path, ".git")
+        git_dir = None
+
+        if os.path.isdir(dot_git):
+            git_dir = dot_git
+        elif os.path.isfile(dot_git):
+            # Submodules and worktrees use a "gitdir: <path>" file
+            with open(dot_git) as f:
+                content = f.read().strip()
+            if content.startswith("gitdir:"):
+                git_dir = os.path.normpath(os.path.join(search_path, content[len("gitdir:"):].strip()))
+
+        if git_dir:
+            common_dir = git_dir
+            commondir_file = os.path.join(git_dir, "commondir")
+            if os.path.isfile(commondir_file):
+                with open(commondir_file) as f:
+                    common_dir = os.path.normpath(os.path.join(git_dir, f.read().strip()))
+
+            # Repos using the reftable backend can't be read directly
+            if not os.path.exists(os.path.join(common_dir, "reftable")):
+                git_dirs = (git_dir, common_dir)
+            break
+
+        parent_path = os.path.dirname(search_path)
+        if parent_path == search_path:
+            break
+        search_path = parent_path
+
+    _git_dirs_cache[repo_path] = git_dirs
+    return git_dirs
+
+def read_git_state_file(path):
+    # Read every time rather than cached: a ref file is as cheap to read as to stat, and two refs written within one
+    # mtime tick would look unchanged. A ref like refs/heads/release is a folder when branches such as release/1.0 exist
+    try:
+        with open(path) as f:
+            content = f.read()
+    except OSError:
+        return None
+
+    if os.path.basename(path) == "packed-refs":
+        packed_refs = {}
+        for line in content.splitlines():
+            if line and line[0] not in "#^":
+                sha, _, ref_name = line.partition(" ")
+                packed_refs[ref_name] = sha
+        content = packed_refs
+    else:
+        content = content.strip()
+
+    return content
+
+def resolve_git_ref(ref_name, repo_path=None):
+    git_dir, common_dir = find_git_dirs(repo_path or get_repo_path())
+    if not git_dir:
+        return None
+
+    # Follow symbolic refs such as HEAD -> refs/heads/main
+    for _ in range(5):
+        ref_dir = git_dir if ref_name == "HEAD" else common_dir
+        content = read_git_state_file(os.path.join(ref_dir, ref_name))
+
+        if content is None:
+            packed_refs = read_git_state_file(os.path.join(common_dir, "packed-refs")) or {}
+            return packed_refs.get(ref_name)
+
+        if not content.startswith("ref:"):
+            return content
+
+        ref_name = content[len("ref:"):].strip()
+
+    return None
+
+def get_current_branch_name():
+    repo_path = get_repo_path()
+    if not repo_path:
+        return None
+
+    git_dir, common_dir = find_git_dirs(repo_path)
+    if git_dir:
+        head = read_git_state_file(os.path.join(git_dir, "HEAD"))
+        if head and head.startswith("ref: refs/heads/"):
+            return head[len("ref: refs/heads/"):]
+        if head:
+            # Detached HEAD, matches `git rev-parse --abbrev-ref HEAD`
+            return "HEAD"
+
+    try:
+        git_command = ["git", "-C", repo_path, "rev-parse", "--abbrev-ref", "HEAD"]
+        result = run_captured_command(git_command)
+        if result.returncode == 0:
+            return result.stdout.strip()
+    except subprocess.CalledProcessError:
+        return None
+    
+    return None
+
+def parse_status_output(output):
+    # Parses NUL separated `git status --porcelain=v2 -z` records
+    entries = []
+    records = output.split("\0")
+    index = 0
+
+    while index < len(records):
+        record = records[index]
+        index += 1
+
+        if record.startswith("1 "):
+            # 1 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <path>
+            fields = record.split(" ", 8)
+            entries.append(StatusEntry(fields[8], fields[1], fields[2].startswith("S")))
+        elif record.startswith("2 "):
+            # 2 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <X><score> <path>, followed by the original path
+            fields = record.split(" ", 9)
+            orig_path = records[index] if index < len(records) else None
+            index += 1
+            entries.append(StatusEntry(fields[9], fields[1], fields[2].startswith("S"), orig_path))
+        elif record.startswith("u "):
+            # u <XY> <sub> <m1> <m2> <m3> <mW> <h1> <h2> <h3> <path>
+            fields = record.split(" ", 10)
+            entries.append(StatusEntry(fields[10], fields[1], fields[2].startswith("S")))
+        elif record.startswith("? "):
+            entries.append(StatusEntry(record[2:], "??"))
+        elif record.startswith("! "):
+            entries.append(StatusEntry(record[2:], "!!"))
+
+    return entries
+
+@timed_step
+def get_status_entries():
+    status_command = get_git_command(["status", "--porcelain=v2", "-z"])
+
+    result = run_captured_command(status_command, errors="surrogateescape")
+    if result.returncode != 0:
+        print(f"Error: Unable to get repo status: {result.stderr.strip()}")
+        return []
+
+    return parse_status_output(result.stdout)
+
+@timed_step
+def add_without_submodules(status_entries=None):
+    # Logic to only add non-submodule changes
+    if status_entries is None:
+        status_entries = get_status_entries()
+
+    # Entries without worktree changes (Y is ".") are already staged
+    paths = [entry.path for entry in status_entries if not entry.is_submodule and entry.state[1] != "."]
+    if not paths:
+        return True
+
+    # Stage everything with one git process, paths are fed through stdin so there is no argument length limit
+    add_command = get_git_command(["--literal-pathspecs", "add", "--pathspec-from-file=-", "--pathspec-file-nul"])
+    pathspec = "\0".join(paths).encode("utf-8", "surrogateescape")
+
+    result = run_captured_command(add_command, input=pathspec, text=False)
+    if result.returncode != 0:
+        print(f"Error: Unable to add changes: {result.stderr.decode(errors='replace').strip()}")
+        return False
+
+    return True
+
+def get_config_values(config):
+    return {section: dict(config.items(section, raw=True)) for section in config.sections()}
+
+def get_gith_config_mtime():
+    try:
+        return os.stat(GITH_CONFIG_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+def read_gith_config():
+    # Serve the parsed snapshot while the file is unchanged, or while we have unflushed changes
+    cached_config = _config_store["config"]
+    if cached_config is not None:
+        if _config_store["dirty"] or _config_store["mtime"] == get_gith_config_mtime():
+            return cached_config
+
+    # Non-strict parsing merges duplicate sections in memory, the next write removes them from the file
+    config = configparser.ConfigParser(strict=False)
+    mtime = get_gith_config_mtime()
+    dirty = False
+
+    if mtime is not None:
+        try:
+            config.read(GITH_CONFIG_FILE)
+        except configparser.MissingSectionHeaderError:
+            # Handle improperly formatted .githconfig file
+            print(f"Invalid .githconfig file. Creating a new one with default section headers.")
+            config = configparser.ConfigParser(strict=False)
+            dirty = True
+
+    # Only the values changed after this point are written back, see flush_gith_config()
+    base = get_config_values(config)
+
+    if mtime is None:
+        # Create the .githconfig file with a default section header
+        config.add_section("default")
+        dirty = True
+
+    _config_store["config"] = config
+    _config_store["mtime"] = mtime
+    _config_store["dirty"] = dirty
+    _config_store["templates"] = {}
+    _config_store["base"] = base
+
+    return config
+
+def write_gith_config(config):
+    # Writes are batched, the file is rewritten once by flush_gith_config()
+    _config_store["config"] = config
+    _config_store["dirty"] = True
+
+@contextlib.contextmanager
+def gith_config_lock():
+    # A lock file next to the config, so parallel gith invocations take turns merging their changes into it.
+    # A lock left behind by a gith process that was killed is taken over once it is old enough
+    lock_path = GITH_CONFIG_FILE + ".lock"
+    start_time = time.monotonic()
+    while True:
+        try:
+            lock_fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.stat(lock_path).st_mtime > CONFIG_LOCK_TIMEOUT:
+                    os.remove(lock_path)
+                    continue
+            except FileNotFoundError:
+                continue
+
+            if time.monotonic() - start_time > CONFIG_LOCK_TIMEOUT:
+                raise TimeoutError(f"{lock_path} is held by another gith process")
+            time.sleep(0.01)
+
+    try:
+        os.close(lock_fd)
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+def merge_gith_config_changes(config, base):
+    # Applies the changes made to config since it was read as base onto the config currently on disk, so values
+    # another gith process wrote in the meantime are kept
+    merged_config = configparser.ConfigParser(strict=False)
+    try:
+        merged_config.read(GITH_CONFIG_FILE)
+    except configparser.MissingSectionHeaderError:
+        merged_config = configparser.ConfigParser(strict=False)
+
+    values = get_config_values(config)
+    for section in base:
+        if section not in values:
+            merged_config.remove_section(section)
+
+    for section, options in values.items():
+        base_options = base.get(section, {})
+        if not merged_config.has_section(section):
+            merged_config.add_section(section)
+
+        for option_name, value in options.items():
+            if base_options.get(option_name) != value:
+                merged_config.set(section, option_name, value)
+        for option_name in base_options:
+            if option_name not in options:
+                merged_config.remove_option(section, option_name)
+
+    return merged_config
+
+def flush_gith_config():
+    config = _config_store["config"]
+    if config is None or not _config_store["dirty"]:
+        return
+
+    try:
+        with gith_config_lock():
+            write_merged_gith_config(config)
+    except OSError as e:
+        # TimeoutError from the lock is an OSError too
+        print(f"Error: Unable to write {GITH_CONFIG_FILE}: {e}")
+
+def write_merged_gith_config(config):
+    merged_config = merge_gith_config_changes(config, _config_store["base"])
+
+    # Write to a temporary file and swap it in, so parallel gith invocations never see a partial file
+    config_dir = os.path.dirname(GITH_CONFIG_FILE)
+    fd, temp_path = tempfile.mkstemp(prefix=".githconfig.", dir=config_dir, text=True)
+    try:
+        with os.fdopen(fd, "w") as config_file:
+            merged_config.write(config_file)
+
+        # mkstemp creates the file readable only by us, keep the mode the config had, or the one open() would give it
+        try:
+            config_mode = stat.S_IMODE(os.stat(GITH_CONFIG_FILE).st_mode)
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            config_mode = 0o666 & ~umask
+        os.chmod(temp_path, config_mode)
+
+        os.replace(temp_path, GITH_CONFIG_FILE)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _config_store["config"] = merged_config
+    _config_store["mtime"] = get_gith_config_mtime()
+    _config_store["dirty"] = False
+    _config_store["base"] = get_config_values(merged_config)
+
+def get_submodule_paths(recursive=True):
+    foreach_command = ["submodule", "--quiet", "foreach"]
+    if recursive:
+        foreach_command.append("--recursive")
+
+    # $displaypath is relative to the repo root, including for nested submodules
+    result = run_captured_command(get_git_command(foreach_command + ["echo $displaypath"]))
+    if result.returncode != 0:
+        return []
+
+    return [path.strip() for path in result.stdout.splitlines() if path.strip()]
+
+def clean_submodule(submodule_dir, clean_untracked=True):
+    errors = []
+    clean_steps = [["clean", "-ffdx"]] if clean_untracked else []
+    for args in clean_steps + [["restore", "--staged", "."], ["checkout", "."]]:
+        result = run_captured_command(["git"] + args, cwd=submodule_dir)
+        if result.returncode != 0:
+            errors.append(f"'git {' '.join(args)}' failed: {result.stderr.strip()}")
+
+    return errors
+
+@timed_step
+def clean_submodules(jobs=None, clean_untracked=True):
+    repo_path = get_repo_path()
+    submodule_paths = [path for path in get_submodule_paths() if os.path.exists(os.path.join(repo_path, path))]
+    if not submodule_paths:
+        return True
+
+    if not jobs or jobs < 1:
+        jobs = os.cpu_count() or 1
+
+    print(f"\nCleaning {len(submodule_paths)} submodules using {jobs} jobs")
+
+    # Nested submodules are separate repos, so they can be cleaned alongside their parents
+    failed_count = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(clean_submodule, os.path.join(repo_path, path), clean_untracked): path for path in submodule_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            errors = future.result()
+            if errors:
+                failed_count += 1
+                print(f"Error: Unable to clean submodule '{path}'")
+                for error in errors:
+                    print(f"    {error}")
+            else:
+                print(f"Cleaned submodule: {path}")
+
+    if failed_count > 0:
+        print(f"Error: {failed_count} of {len(submodule_paths)} submodules failed to clean")
+        return False
+
+    return True
+
+def get_submodule_entries():
+    # Returns (name, path) for every top level submodule listed in .gitmodules
+    result = run_captured_command(get_git_command(["config", "--file", ".gitmodules", "--get-regexp", r"^submodule\..*\.path$"]))
+
+    entries = []
+    for line in result.stdout.splitlines():
+        key, _, path = line.partition(" ")
+        name = key[len("submodule."):-len(".path")]
+        entries.append((name, path))
+
+    return entries
+
+def get_submodule_cache_repo(cache_dir, submodule_name):
+    cache_name = re.sub(r"[^A-Za-z0-9_.-]", "_", submodule_name)
+    return os.path.join(os.path.expanduser(cache_dir), cache_name + ".git")
+
+def update_submodule_cache(cache_repo, submodule_dir):
+    # The cache is a bare repo that other workspaces borrow objects from through git alternates, so it must never
+    # lose an object: every commit it is given keeps its own ref, and gc never prunes unreachable objects
+    if not os.path.isdir(cache_repo):
+        os.makedirs(os.path.dirname(cache_repo), exist_ok=True)
+        result = run_streaming_command(["git", "clone", "--bare", "--progress", "--config", "gc.pruneExpire=never", submodule_dir, cache_repo], FETCH_INACTIVITY_TIMEOUT, echo=False, timeout=SUBMODULE_UPDATE_TIMEOUT)
+        return not result.timed_out and result.returncode == 0
+
+    head_sha = resolve_git_ref("HEAD", submodule_dir)
+    refspecs = ["+refs/heads/*:refs/heads/*"] + ([f"+HEAD:refs/gith/commits/{head_sha}"] if head_sha else [])
+
+    # -c also covers caches created before gc.pruneExpire was set in their config
+    fetch_command = ["git", "-c", "gc.pruneExpire=never", "-C", cache_repo, "fetch", "--progress", submodule_dir] + refspecs
+    result = run_streaming_command(fetch_command, FETCH_INACTIVITY_TIMEOUT, echo=False, timeout=SUBMODULE_UPDATE_TIMEOUT)
+    return not result.timed_out and result.returncode == 0
+
+def update_submodule(path, cache_repo=None):
+    update_args = ["submodule", "update", "--init", "--recursive"]
+    if cache_repo and os.path.isdir(cache_repo):
+        update_args += ["--reference", cache_repo]
+
+    # Progress output keeps the inactivity timeout from firing while a large submodule is cloning
+    update_args.append("--progress")
+    result = run_streaming_command(get_git_command(update_args + ["--", path]), FETCH_INACTIVITY_TIMEOUT, echo=False, timeout=SUBMODULE_UPDATE_TIMEOUT)
+    if result.timed_out:
+        if result.duration >= SUBMODULE_UPDATE_TIMEOUT:
+            return f"Took longer than {SUBMODULE_UPDATE_TIMEOUT} seconds"
+        return f"No progress for {FETCH_INACTIVITY_TIMEOUT} seconds"
+    if result.returncode != 0:
+        return "\n    ".join(result.output_tail[-5:])
+
+    # A cache that can't be updated only makes the next clone slower, it doesn't fail the update
+    if cache_repo and not update_submodule_cache(cache_repo, os.path.join(get_repo_path(), path)):
+        print(f"Unable to update the submodule cache for '{path}'")
+
+    return ""
+
+@timed_step
+def update_submodules(jobs=None, cache_dir=None):
+    submodule_entries = get_submodule_entries()
+    if not submodule_entries:
+        return True
+
+    try:
+        jobs = int(jobs) if jobs else os.cpu_count() or 1
+    except ValueError:
+        print(f"Error: '{jobs}' is not a valid submodule job count")
+        return False
+
+    print(f"Updating {len(submodule_entries)} submodules using {jobs} jobs")
+
+    start_times = {}
+
+    def timed_update(path, cache_repo):
+        start_times[path] = time.monotonic()
+        error = update_submodule(path, cache_repo)
+        return error, time.monotonic() - start_times.pop(path)
+
+    failed_count = 0
+    progress_interval = 30
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        futures = {}
+        for name, path in submodule_entries:
+            cache_repo = get_submodule_cache_repo(cache_dir, name) if cache_dir else None
+            futures[executor.submit(timed_update, path, cache_repo)] = path
+
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=progress_interval, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                path = futures[future]
+                error, duration = future.result()
+                if error:
+                    failed_count += 1
+                    print(f"Error: Unable to update submodule '{path}' ({duration:.1f}s)\n    {error}")
+                else:
+                    print(f"Updated submodule: {path} ({duration:.1f}s)")
+
+            # Periodically list what is still running, so a single slow submodule stands out
+            if pending and not done:
+                now = time.monotonic()
+                running = ", ".join(f"{path} ({now - start_time:.0f}s)" for path, start_time in list(start_times.items()))
+                print(f"Still updating: {running}")
+
+    if failed_count > 0:
+        print(f"Error: {failed_count} of {len(submodule_entries)} submodules failed to update")
+        return False
+
+    return True
+
+@timed_step
+def clean_non_git_files(jobs=None, mode="", dry_run=False):
+    if mode == "":
+        mode = get_profile_option("clean_mode", "full")
+
+    if mode == "snapshot":
+        return record_clean_manifest()
+    elif mode == "incremental":
+        return incremental_clean(jobs, dry_run)
+    elif mode not in ("full", "fast", "trash"):
+        print(f"Error: '{mode}' is not a valid clean mode, choose between (full, fast, trash, incremental, snapshot)")
+        return False
+
+    if dry_run:
+        print("Error: --dry-run is only supported by incremental cleans")
+        return False
+
+    if mode == "fast":
+        return fast_clean(jobs)
+    elif mode == "trash":
+        return trash_clean(jobs)
+
+    # Removing a large directory prints nothing until it is done, so there is no inactivity timeout.
+    # No stdin, so git answers "no" if it asks to retry a deletion that failed
+    run_git_command(["clean", "-ffdx"], 0, 0, stdin=subprocess.DEVNULL)
+
+    passed = clean_submodules(jobs)
+    record_clean_manifest(False)
+
+    return passed
+
+def list_clean_paths(directory):
+    # Same set of paths `git clean -ffdx` removes, fully untracked directories are listed once as "dir/"
+    result = run_captured_command(["git", "-C", directory, "ls-files", "-z", "--others", "--directory"], text=False)
+    if result.returncode != 0:
+        return []
+
+    return [os.path.join(directory, path.rstrip("/")) for path in result.stdout.decode("utf-8", "surrogateescape").split("\0") if path]
+
+def unlink_files(file_paths):
+    failed_paths = []
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except PermissionError:
+            # Read-only files can't be removed on Windows until they are made writable
+            try:
+                os.chmod(file_path, stat.S_IWRITE)
+                os.remove(file_path)
+            except OSError:
+                failed_paths.append(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            failed_paths.append(file_path)
+
+    return failed_paths
+
+def is_junction(path):
+    # Windows directory junctions aren't symlinks to os.path.islink, walking into one would delete files outside the repo
+    if platform.system() != "Windows":
+        return False
+
+    if hasattr(os.path, "isjunction"):
+        return os.path.isjunction(path)
+
+    try:
+        return os.lstat(path).st_reparse_tag == stat.IO_REPARSE_TAG_MOUNT_POINT
+    except OSError:
+        return False
+
+def collect_tree(path):
+    file_paths = []
+    dir_paths = []
+    pending_dirs = [path]
+
+    while pending_dirs:
+        dir_path = pending_dirs.pop()
+        dir_paths.append(dir_path)
+        try:
+            with os.scandir(dir_path) as dir_entries:
+                for dir_entry in dir_entries:
+                    if dir_entry.is_dir(follow_symlinks=False) and is_junction(dir_entry.path):
+                        # rmdir removes the junction itself and leaves its target alone, like shutil.rmtree
+                        dir_paths.append(dir_entry.path)
+                    elif dir_entry.is_dir(follow_symlinks=False):
+                        pending_dirs.append(dir_entry.path)
+                    else:
+                        file_paths.append(dir_entry.path)
+        except OSError:
+            continue
+
+    return file_paths, dir_paths
+
+def fast_delete_paths(paths, jobs=None):
+    if not jobs or jobs < 1:
+        jobs = min(32, (os.cpu_count() or 1) * 4)
+
+    junction_paths = [path for path in paths if is_junction(path)]
+    file_paths = [path for path in paths if (not os.path.isdir(path) or os.path.islink(path)) and path not in junction_paths]
+    top_dirs = [path for path in paths if os.path.isdir(path) and not os.path.islink(path) and path not in junction_paths]
+
+    failed_paths = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        # Directory trees are listed in parallel, then their files are unlinked in batches across the pool
+        dir_paths = list(junction_paths)
+        for tree_files, tree_dirs in executor.map(collect_tree, top_dirs):
+            file_paths += tree_files
+            dir_paths += tree_dirs
+
+        batch_size = 256
+        batches = [file_paths[index:index + batch_size] for index in range(0, len(file_paths), batch_size)]
+        for batch_failures in executor.map(unlink_files, batches):
+            failed_paths += batch_failures
+
+    # Deepest directories first, so each one is empty by the time it is removed
+    for dir_path in sorted(dir_paths, key=len, reverse=True):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            failed_paths.append(dir_path)
+
+    return len(file_paths), failed_paths
+
+def get_clean_directories(repo_path):
+    return [repo_path] + [os.path.join(repo_path, path) for path in get_submodule_paths() if os.path.isdir(os.path.join(repo_path, path))]
+
+@timed_step
+def fast_clean(jobs=None):
+    repo_path = get_repo_path()
+    clean_paths = [path for directory in get_clean_directories(repo_path) for path in list_clean_paths(directory)]
+
+    start_time = time.monotonic()
+    file_count, failed_paths = fast_delete_paths(clean_paths, jobs)
+    print(f"Removed {file_count} files in {time.monotonic() - start_time:.1f}s")
+
+    for failed_path in failed_paths[:20]:
+        print(f"Error: Unable to remove '{failed_path}'")
+
+    passed = clean_submodules(jobs, False) and not failed_paths
+    record_clean_manifest(False)
+
+    return passed
+
+@timed_step
+def trash_clean(jobs=None):
+    repo_path = get_repo_path()
+    git_dir, _ = find_git_dirs(repo_path)
+    if not git_dir:
+        print("Error: Not a git repository")
+        return False
+
+    # The trash lives in the git dir, on the same volume as the repo so every move is a cheap rename
+    trash_root = os.path.join(git_dir, TRASH_DIR_NAME)
+    trash_dir = os.path.join(trash_root, str(time.time_ns()))
+    os.makedirs(trash_dir, exist_ok=True)
+
+    clean_paths = [path for directory in get_clean_directories(repo_path) for path in list_clean_paths(directory)]
+
+    unmoved_paths = []
+    for index, path in enumerate(clean_paths):
+        try:
+            os.rename(path, os.path.join(trash_dir, str(index)))
+        except OSError:
+            unmoved_paths.append(path)
+
+    print(f"Moved {len(clean_paths) - len(unmoved_paths)} paths to the trash, purging it in the background")
+
+    # Paths that couldn't be renamed, e.g. open files or another volume, are deleted in place
+    failed_paths = []
+    if unmoved_paths:
+        _, failed_paths = fast_delete_paths(unmoved_paths, jobs)
+        for failed_path in failed_paths[:20]:
+            print(f"Error: Unable to remove '{failed_path}'")
+
+    start_background_gith(["purge-trash", trash_root])
+
+    passed = clean_submodules(jobs, False) and not failed_paths
+    record_clean_manifest(False)
+
+    return passed
+
+def start_background_gith(gith_args):
+    gith_command = [sys.executable, os.path.abspath(__file__)] + gith_args
+
+    # Detach so the process outlives this command and its console window
+    if platform.system() == "Windows":
+        subprocess.Popen(gith_command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP)
+    else:
+        subprocess.Popen(gith_command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+def purge_trash_command(trash_root):
+    # Only ever deletes gith trash folders
+    if os.path.basename(os.path.normpath(trash_root)) != TRASH_DIR_NAME:
+        print(f"Error: '{trash_root}' is not a gith trash folder")
+        return
+
+    if os.path.isdir(trash_root):
+        fast_delete_paths([os.path.join(trash_root, name) for name in os.listdir(trash_root)])
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.1f} {unit}" if unit != "B" else f"{size} B"
+        size /= 1024
+
+def get_clean_manifest_file(repo_path):
+    repo_hash = hashlib.sha1(os.path.abspath(repo_path).encode()).hexdigest()[:16]
+    return f"clean_manifest_{repo_hash}.json"
+
+def get_untracked_file_states(repo_path):
+    # Maps every untracked and ignored path, relative to the repo root and including submodules, to [size, mtime]
+    file_states = {}
+
+    for prefix in [""] + get_submodule_paths():
+        result = run_captured_command(["git", "-C", os.path.join(repo_path, prefix), "ls-files", "-z", "--others"], text=False)
+        if result.returncode != 0:
+            continue
+
+        for path in result.stdout.decode("utf-8", "surrogateescape").split("\0"):
+            if not path:
+                continue
+
+            # Untracked nested repos are listed as "dir/", they are kept or removed as a whole
+            relative_path = f"{prefix}/{path}" if prefix else path
+            try:
+                file_stat = os.lstat(os.path.join(repo_path, relative_path))
+            except OSError:
+                continue
+            file_states[relative_path.rstrip("/")] = [file_stat.st_size, file_stat.st_mtime_ns]
+
+    return file_states
+
+@timed_step
+def record_clean_manifest(verbose=True):
+    repo_path = get_repo_path()
+    file_states = get_untracked_file_states(repo_path)
+    write_state_file(get_clean_manifest_file(repo_path), {"repo_path": repo_path, "time": time.time(), "files": file_states})
+
+    if verbose:
+        total_size = sum(state[0] for state in file_states.values())
+        print(f"Recorded {len(file_states)} non-git files ({format_size(total_size)}) for incremental cleans")
+
+    return True
+
+def remove_path(repo_path, relative_path):
+    path = os.path.join(repo_path, relative_path)
+    try:
+        if is_junction(path):
+            os.rmdir(path)
+        elif os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError as e:
+        print(f"Error: Unable to remove '{relative_path}': {e}")
+        return False
+
+    # Remove directories left empty, rmdir fails on the first one that still has content
+    parent_path = os.path.dirname(path)
+    while len(parent_path) > len(repo_path):
+        try:
+            os.rmdir(parent_path)
+        except OSError:
+            break
+        parent_path = os.path.dirname(parent_path)
+
+    return True
+
+@timed_step
+def incremental_clean(jobs=None, dry_run=False):
+    repo_path = get_repo_path()
+    manifest = read_state_file(get_clean_manifest_file(repo_path))
+
+    if manifest is None and not dry_run:
+        print("No manifest recorded for this repo yet, running a full clean")
+        return clean_non_git_files(jobs, "full")
+
+    # Anything new, or changed since the manifest was recorded, is removed
+    recorded_states = manifest["files"] if manifest else {}
+    current_states = get_untracked_file_states(repo_path)
+    stale_paths = sorted(path for path, state in current_states.items() if recorded_states.get(path) != state)
+
+    stale_size = sum(current_states[path][0] for path in stale_paths)
+    kept_size = sum(state[0] for state in current_states.values()) - stale_size
+    kept_count = len(current_states) - len(stale_paths)
+
+    if dry_run:
+        print(f"Would remove {len(stale_paths)} new or changed files ({format_size(stale_size)})")
+        print(f"Would keep {kept_count} unchanged files ({format_size(kept_size)})")
+        for path in sorted(stale_paths, key=lambda path: current_states[path][0], reverse=True)[:20]:
+            print(f"    {format_size(current_states[path][0]):>10}  {path}")
+        return True
+
+    print(f"Removing {len(stale_paths)} new or changed files ({format_size(stale_size)}), keeping {kept_count} unchanged files ({format_size(kept_size)})")
+
+    passed = True
+    for path in stale_paths:
+        passed = remove_path(repo_path, path) and passed
+
+    # Tracked changes in submodules are still reset, only untracked files are left alone
+    passed = clean_submodules(jobs, False) and passed
+    record_clean_manifest(False)
+
+    return passed
+
+def get_worktrees():
+    # Parses `git worktree list --porcelain` into dicts with "worktree", "HEAD" and "branch" keys
+    result = run_captured_command(get_git_command(["worktree", "list", "--porcelain"]))
+
+    worktrees = []
+    current_worktree = {}
+    for line in result.stdout.splitlines() + [""]:
+        if not line:
+            if current_worktree:
+                worktrees.append(current_worktree)
+            current_worktree = {}
+            continue
+
+        key, _, value = line.partition(" ")
+        current_worktree[key] = value
+
+    return worktrees
+
+def get_branch_worktree(branch_name):
+    for worktree in get_worktrees():
+        if worktree.get("branch") == f"refs/heads/{branch_name}":
+            return worktree["worktree"]
+
+    return None
+
+def get_new_worktree_path(branch_name):
+    # Worktrees sit next to the main checkout by default, one folder per branch
+    worktree_dir = get_profile_option("worktree_dir")
+    if not worktree_dir:
+        worktrees = get_worktrees()
+        main_worktree = worktrees[0]["worktree"] if worktrees else get_repo_path()
+        worktree_dir = os.path.normpath(main_worktree) + "-worktrees"
+
+    return os.path.join(os.path.expanduser(worktree_dir), re.sub(r"[^A-Za-z0-9_.-]", "-", branch_name))
+
+def switch_to_worktree(worktree_path):
+    # Commands use the current directory as the repo, so move into the worktree for the submodule update
+    os.chdir(worktree_path)
+
+    print("\nInitializing and updating submodules")
+    passed = submodule_command()
+    if not passed:
+        print("Error: failed to update submodules")
+
+    set_repo_path(worktree_path)
+    print(f"\nSwitched the '{get_current_profile()}' profile to worktree: {worktree_path}")
+    print(f"Run `cd {worktree_path}` to start working in it")
+
+    return passed
+
+def get_bench_env(bench_dir):
+    # Isolated HOME so the benchmark never reads or changes the real gith profiles, config and state
+    home_dir = os.path.join(bench_dir, "home")
+    os.makedirs(home_dir, exist_ok=True)
+
+    env = {key: value for key, value in os.environ.items() if not key.startswith("GIT_") and key != "GITH_PROFILE"}
+    env.update({
+        "HOME": home_dir,
+        "USERPROFILE": home_dir,
+        "GIT_CONFIG_NOSYSTEM": "1",
+        "GIT_CONFIG_COUNT": "3",
+        "GIT_CONFIG_KEY_0": "user.name",
+        "GIT_CONFIG_VALUE_0": "gith bench",
+        "GIT_CONFIG_KEY_1": "user.email",
+        "GIT_CONFIG_VALUE_1": "bench@gith",
+        # Submodules are cloned from local bare repos
+        "GIT_CONFIG_KEY_2": "protocol.file.allow",
+        "GIT_CONFIG_VALUE_2": "always",
+    })
+
+    return env
+
+def run_bench_git(args, env, cwd):
+    result = subprocess.run(["git"] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+
+def write_bench_files(directory, prefix, count, size=1024):
+    # Spread files over folders of 100, like a real source tree
+    for index in range(count):
+        folder = os.path.join(directory, f"{prefix}{index // 100}")
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, f"file{index}.txt"), "w") as f:
+            f.write(f"{prefix} {index}\n" * (size // 16))
+
+def create_bench_repo(bench_dir, env, file_count, submodule_count):
+    # Bare repos on disk act as the remote, so no network is needed
+    remote_dir = os.path.join(bench_dir, "remote.git")
+    source_dir = os.path.join(bench_dir, "source")
+    workspace_dir = os.path.join(bench_dir, "workspace")
+
+    for index in range(submodule_count):
+        submodule_source = os.path.join(bench_dir, f"submodule{index}")
+        submodule_remote = os.path.join(bench_dir, f"submodule{index}.git")
+        run_bench_git(["init", "-q", "-b", "main", submodule_source], env, bench_dir)
+        write_bench_files(submodule_source, "lib", max(file_count // 10, 1))
+        run_bench_git(["add", "."], env, submodule_source)
+        run_bench_git(["commit", "-q", "-m", "Initial commit"], env, submodule_source)
+        run_bench_git(["clone", "-q", "--bare", submodule_source, submodule_remote], env, bench_dir)
+
+    run_bench_git(["init", "-q", "-b", "main", source_dir], env, bench_dir)
+    write_bench_files(source_dir, "src", file_count)
+    with open(os.path.join(source_dir, ".gitignore"), "w") as f:
+        f.write("build/\n")
+    for index in range(submodule_count):
+        run_bench_git(["submodule", "add", "-q", os.path.join(bench_dir, f"submodule{index}.git"), f"external/submodule{index}"], env, source_dir)
+    run_bench_git(["add", "."], env, source_dir)
+    run_bench_git(["commit", "-q", "-m", "Initial commit"], env, source_dir)
+
+    run_bench_git(["clone", "-q", "--bare", source_dir, remote_dir], env, bench_dir)
+    run_bench_git(["remote", "add", "origin", remote_dir], env, source_dir)
+    run_bench_git(["fetch", "-q", "origin"], env, source_dir)
+    run_bench_git(["clone", "-q", "--recurse-submodules", remote_dir, workspace_dir], env, bench_dir)
+
+    return source_dir, workspace_dir
+
+def run_bench_gith(gith_args, env, cwd):
+    start_time = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.abspath(__file__)] + gith_args, cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    duration = time.perf_counter() - start_time
+
+    # gith reports most failures as "Error:" lines instead of an exit code
+    output = result.stdout + result.stderr
+    failed = result.returncode != 0 or "Error:" in output
+    if failed:
+        print(f"Error: gith {' '.join(gith_args)} failed during the benchmark:\n{output.strip()[-2000:]}")
+
+    return duration, not failed
+
+def get_bench_steps(source_dir, workspace_dir, env, file_count):
+    # Each step is (name, setup, gith arguments), setup runs untimed before every run
+    def change_tracked_file(run):
+        with open(os.path.join(workspace_dir, "src0", "file0.txt"), "a") as f:
+            f.write(f"bench run {run}\n")
+
+    def push_upstream_commit(run):
+        with open(os.path.join(source_dir, "src0", "file1.txt"), "a") as f:
+            f.write(f"upstream run {run}\n")
+        run_bench_git(["commit", "-q", "-am", f"Upstream change {run}"], env, source_dir)
+        run_bench_git(["push", "-q", "origin", "main"], env, source_dir)
+
+    def write_build_files(run):
+        write_bench_files(os.path.join(workspace_dir, "build"), "obj", file_count)
+
+    return [
+        ("status", None, lambda run: ["status"]),
+        ("commit", change_tracked_file, lambda run: ["commit", f"Bench change {run}"]),
+        ("fetch", push_upstream_commit, lambda run: ["fetch"]),
+        ("branch", None, lambda run: ["branch", f"bench-{run}"]),
+        ("clean", write_build_files, lambda run: ["clean"]),
+        ("sub-init", None, lambda run: ["sub-init"]),
+    ]
+
+def get_running_pid(pid_file):
+    # pid of the background gith process that wrote pid_file, or None when it isn't running
+    try:
+        with open(os.path.join(GITH_STATE_DIR, pid_file)) as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+    # Signal 0 would be a Ctrl+C on Windows
+    if platform.system() == "Windows":
+        result = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True)
+        return pid if str(pid) in result.stdout else None
+
+    try:
+        os.kill(pid, 0)
+        return pid
+    except OSError:
+        return None
+
+def reap_daemon_children():
+    try:
+        while os.waitpid(-1, os.WNOHANG)[0] > 0:
+            pass
+    except ChildProcessError:
+        pass
+
+def serve_daemon_request(connection):
+    # Runs in the forked child, the command's output goes straight to the client through the socket
+    global _timing_origin
+    exit_code = 1
+
+    try:
+        # Own process group, so the client's Ctrl+C reaches this command and the git processes it starts
+        os.setpgrp()
+        connection.sendall(f"{os.getpid()}\n".encode())
+
+        request = json.loads(connection.makefile("rb").readline())
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        use_home_paths()
+
+        # Child processes such as git write to the socket too, they get no stdin
+        os.dup2(connection.fileno(), 1)
+        os.dup2(connection.fileno(), 2)
+        os.dup2(os.open(os.devnull, os.O_RDONLY), 0)
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+
+        sys.argv = [os.path.abspath(__file__)] + request["argv"]
+        _timing_origin = time.perf_counter()
+        try:
+            main()
+            exit_code = 0
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else int(e.code is not None)
+        except KeyboardInterrupt:
+            exit_code = 130
+    except Exception:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            connection.sendall(DAEMON_EXIT_MARKER + f"{exit_code}\n".encode())
+        except OSError:
+            pass
+        os._exit(0)
+
+def use_home_paths():
+    # The config and state paths come from HOME, a daemon request from another HOME must not see the daemon's files
+    global GITH_CONFIG_FILE, GITH_STATE_DIR
+    config_file = os.path.expanduser("~/.githconfig")
+    GITH_STATE_DIR = os.path.expanduser("~/.gith")
+
+    if config_file != GITH_CONFIG_FILE:
+        GITH_CONFIG_FILE = config_file
+        _config_store.update({"config": None, "mtime": None, "dirty": False, "templates": {}, "base": {}})
+
+def warm_daemon_state():
+    # Everything loaded here is inherited by every forked request: the parsed config, the compiled macros of every
+    # shortcut and where each profile's repo keeps its .git. Ref contents are always read fresh
+    config = read_gith_config()
+
+    for section in config.sections():
+        for option_name, shortcut_command in config.items(section):
+            if not option_name.startswith(SHORTCUT_PREFIX.lower()):
+                continue
+
+            shortcut_command = shortcut_command.replace(SHORTCUT_PREFIX, "")
+            compile_template(shortcut_command)
+            with contextlib.redirect_stdout(io.StringIO()):
+                stages = parse_shortcut_stages(shortcut_command) or []
+            for stage in stages:
+                for step in stage:
+                    for template in [step] if isinstance(step, str) else step:
+                        compile_template(template)
+
+        if config.has_option(section, "repo_path"):
+            find_git_dirs(config.get(section, "repo_path"))
+
+    return config
+
+def run_daemon():
+    socket_path = os.path.join(GITH_STATE_DIR, DAEMON_SOCKET_FILE)
+    pid_path = os.path.join(GITH_STATE_DIR, DAEMON_PID_FILE)
+    script_path = os.path.abspath(__file__)
+    script_mtime = get_mtime(script_path)
+
+    os.makedirs(GITH_STATE_DIR, exist_ok=True)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    server.settimeout(1)
+
+    with open(pid_path, "w") as f:
+        f.write(str(os.getpid()))
+
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+
+    warmed_config = warm_daemon_state()
+    get_arg_parser()
+
+    # A config created with default sections is served while it is unflushed, which would hide later writes from requests
+    flush_gith_config()
+
+    try:
+        # An updated gith.py stops the daemon, so it never runs stale code
+        while get_mtime(script_path) == script_mtime:
+            reap_daemon_children()
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+
+            if get_mtime(script_path) != script_mtime:
+                # Closing without an answer makes the client run the command itself
+                connection.close()
+                break
+
+            connection.settimeout(None)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            if os.fork() == 0:
+                server.close()
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                serve_daemon_request(connection)
+            connection.close()
+
+            # Picks up config changes made by the last command
+            if read_gith_config() is not warmed_config:
+                warmed_config = warm_daemon_state()
+            flush_gith_config()
+    finally:
+        server.close()
+        if get_running_pid(DAEMON_PID_FILE) == os.getpid():
+            os.remove(pid_path)
+            os.remove(socket_path)
+
+def get_tune_state(repo_path):
+    # Everything the TUNE_SETTINGS checks look at, read with a single git process
+    result = run_captured_command(["git", "-C", repo_path, "config", "--list"])
+    config = {}
+    maintenance_repos = set()
+    for line in result.stdout.splitlines():
+        key, _, value = line.partition("=")
+        config[key] = value
+        if key == "maintenance.repo":
+            maintenance_repos.add(os.path.realpath(value))
+
+    git_dir, common_dir = find_git_dirs(repo_path)
+    if not git_dir:
+        return None
 
-    return True
+    # The index starts with "DIRC" and a 4 byte version number
+    index_version = None
+    try:
+        with open(os.path.join(git_dir, "index"), "rb") as f:
+            header = f.read(8)
+        if header[:4] == b"DIRC":
+            index_version = int.from_bytes(header[4:8], "big")
+    except OSError:
+        pass
 
-def find_sln_file(directory):
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith('.sln'):
-                return os.path.join(root, file)
-    return None
+    objects_dir = os.path.join(common_dir, "objects")
+    pack_dir = os.path.join(objects_dir, "pack")
+    pack_count = len([name for name in os.listdir(pack_dir) if name.endswith(".pack")]) if os.path.isdir(pack_dir) else 0
+
+    return {
+        "path": os.path.realpath(repo_path),
+        "config": config,
+        "objects_dir": objects_dir,
+        "pack_count": pack_count,
+        "index_version": index_version,
+        "maintenance_repos": maintenance_repos,
+    }
+
+def time_git_command(repo_path, args, runs):
+    # Median of several runs after a warm up run, so the first run's cold file cache doesn't count
+    durations = []
+    for run in range(runs + 1):
+        start_time = time.perf_counter()
+        result = subprocess.run(["git", "-C", repo_path] + args, capture_output=True)
+        if result.returncode != 0:
+            return None
+        if run > 0:
+            durations.append(time.perf_counter() - start_time)
+
+    return sorted(durations)[len(durations) // 2]
+
+def benchmark_repo_operations(repo_path, runs=5):
+    # Checking out a detached HEAD and going back never changes the working tree, so local changes are safe
+    branch_name = get_current_branch_name()
+    head_target = branch_name or resolve_git_ref("HEAD")
+    timings = {"status": time_git_command(repo_path, ["status", "--porcelain"], runs)}
 
-def is_partial_path(path):
-    cwd = os.getcwd()
-    if not os.path.isabs(path):
-        return True
-    if path.startswith(cwd):
-        return True
-    return False
+    checkout_durations = []
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        detached = subprocess.run(["git", "-C", repo_path, "checkout", "-q", "--detach"], capture_output=True)
+        restored = subprocess.run(["git", "-C", repo_path, "checkout", "-q", head_target], capture_output=True)
+        if detached.returncode != 0 or restored.returncode != 0:
+            break
+        checkout_durations.append(time.perf_counter() - start_time)
 
-def ocr_text(region):
-    # Take a screenshot of the specified region
-    screenshot = pyautogui.screenshot(region=region)
+    timings["checkout"] = sorted(checkout_durations)[len(checkout_durations) // 2] if len(checkout_durations) == runs else None
 
-    # Perform OCR on the screenshot
-    text = pytesseract.image_to_string(screenshot)
+    return timings
 
-    return text.strip()
+def get_prefetch_ref(remote_name, branch_name):
+    return f"refs/prefetch/remotes/{remote_name}/{branch_name}"
 
+def prefetch_repo():
+    repo_path = get_repo_path()
+    git_dir, common_dir = find_git_dirs(repo_path)
+    if not git_dir:
+        print(f"Error: '{repo_path}' is not a git repo")
+        return False
 
-def vs_has_distributed_option(search_region):
-    # Specify the text to search for
-    target_text = "Distributed"
+    # Someone is running git in the repo, try again next time instead of competing with them
+    if os.path.exists(os.path.join(git_dir, "index.lock")):
+        print(f"Skipping prefetch of '{repo_path}', git is busy")
+        return False
 
-    found = False
-    search_time = 3
+    remote_name = get_remote_name()
+    branch_name = get_branch_name()
     start_time = time.time()
-    
-    while time.time() - start_time < search_time:
-        # Perform OCR on the specified region
-        extracted_text = ocr_text(search_region)
 
-        # Check if the target text is present in the extracted text
-        if target_text.lower() in extracted_text.lower():
-            return True
-    
-    return found
+    # Like `git maintenance prefetch`, objects arrive but no branch or FETCH_HEAD the user can see moves
+    prefetch_args = ["fetch", "--quiet", "--no-tags", "--no-write-fetch-head"] + get_fetch_filter_args()
+    passed = run_git_command(prefetch_args + [remote_name, f"+refs/heads/{branch_name}:{get_prefetch_ref(remote_name, branch_name)}"], FETCH_INACTIVITY_TIMEOUT, 0)
+    if not passed:
+        print(f"Error: Unable to prefetch {remote_name}/{branch_name}")
+        return False
 
-def vs_has_compile_option(search_region):
-    # Specify the text to search for
-    compile_text = "Compile"
+    prefetch_state = read_state_file(PREFETCH_STATE_FILE, {})
+    prefetch_state.setdefault(os.path.realpath(common_dir), {})[f"{remote_name}/{branch_name}"] = start_time
+    write_state_file(PREFETCH_STATE_FILE, prefetch_state)
+    print(f"Prefetched {remote_name}/{branch_name} in {time.time() - start_time:.1f}s")
 
-    found = False
-    search_time = 3
-    start_time = time.time()
-    
-    while time.time() - start_time < search_time:
-        # Perform OCR on the specified region
-        extracted_text = ocr_text(search_region)
+    # Submodule updates find their commits locally and skip the network
+    for path in get_submodule_paths():
+        submodule_path = os.path.join(repo_path, path)
+        if not os.path.exists(os.path.join(submodule_path, ".git")):
+            continue
 
-        # Check if the target text is present in the extracted text
-        if compile_text.lower() in extracted_text.lower():
-            return True
-    
-    return found
-    
-def wait_for_vs_load(search_region):
-    # Specify the text to search for
-    debugger_redy_text = "Debugger"
-    extracted_text = ""
-    timeout_time = 180
-    start_time = time.time()
-    
-    while not (debugger_redy_text.lower() in extracted_text.lower()):
-        if time.time() - start_time > timeout_time:
-            return False
-        extracted_text = ocr_text(search_region)
+        if not run_git_command(["-C", submodule_path] + prefetch_args + ["origin", "+refs/heads/*:refs/prefetch/remotes/origin/*"], FETCH_INACTIVITY_TIMEOUT, 0):
+            print(f"Error: Unable to prefetch submodule '{path}'")
+            passed = False
 
-    return True
+    return passed
 
-def close_visual_studio_windows():
-    print("Closing Visual Studio windows")
-    
-    # Use tasklist to get a list of running processes
-    try:
-        process_list = subprocess.check_output(["tasklist"], text=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error: {e}")
-        return
+def run_prefetch_loop(interval_minutes):
+    pid_path = os.path.join(GITH_STATE_DIR, PREFETCH_PID_FILE)
+    log_dir = os.path.join(GITH_STATE_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
 
-    # Find Visual Studio processes
-    visual_studio_processes = [line for line in process_list.splitlines() if "devenv.exe" in line]
+    with open(pid_path, "w") as f:
+        f.write(str(os.getpid()))
 
-    # Terminate Visual Studio processes
-    for process in visual_studio_processes:
-        pid = int(process.split()[1])
-        try:
-            subprocess.check_output(["taskkill", "/F", "/PID", str(pid)])
-        except subprocess.CalledProcessError as e:
-            print(f"Error: {e}")
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
 
+    # Prefetching is background work, leave the CPU to whatever the user is doing
+    if hasattr(os, "nice"):
+        os.nice(10)
 
-def open_visual_studio_distributed_build(sln_path):
-    close_visual_studio_windows()
-    time.sleep(2)
+    try:
+        while True:
+            # Each repo is prefetched by a gith process pinned to its profile, like `gith all`
+            for profile, repo_path in get_profile_repo_paths():
+                if not os.path.isdir(repo_path):
+                    continue
+
+                with open(os.path.join(log_dir, "prefetch.log"), "a") as log_file:
+                    log_file.write(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Prefetching '{profile}' in {repo_path}\n")
+                    log_file.flush()
+                    subprocess.run([sys.executable, os.path.abspath(__file__), "prefetch", "run"], cwd=repo_path, env=dict(os.environ, GITH_PROFILE=profile), stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT)
+
+            time.sleep(interval_minutes * 60)
+    finally:
+        if get_running_pid(PREFETCH_PID_FILE) == os.getpid():
+            os.remove(pid_path)
+
+def get_profile_repo_paths():
+    # Returns (profile, repo_path) for every profile that has a repo set with `gith repo`
+    config = read_gith_config()
+    profile_repos = []
 
-    keyboard_command_wait_time = 0.5
-    
-    sln_file = sln_path
+    for profile in config.sections():
+        if config.has_option(profile, "repo_path"):
+            profile_repos.append((profile, config.get(profile, "repo_path")))
 
-    if is_partial_path(sln_file):
-        sln_file = os.path.join(os.getcwd(), sln_file)
+    return profile_repos
 
-    if sln_path == "" or not os.path.isfile(sln_file) or not sln_file.endswith('.sln'):
-        build_dir = os.path.join(get_repo_path(), 'build')
-        sln_file = find_sln_file(build_dir)
+def print_all_progress_table(progress, redraw):
+    now = time.monotonic()
+    rows = []
+    for profile, state in progress.items():
+        start_time, end_time = state["start_time"], state["end_time"]
+        elapsed = f"{(end_time or now) - start_time:.0f}s" if start_time else ""
+        rows.append((profile, state["status"], elapsed, state["last_line"][:60]))
 
-    if sln_file:
-        # Open the solution file in Visual Studio
-        os.startfile(sln_file)
-
-        screenWidth, screenHeight = pyautogui.size()
-        vsSearchRegion = (0, 0, screenWidth, screenHeight)
-
-        # Wait for Visual Studio to open and the solution to load
-        wait_for_vs_load(vsSearchRegion)
-        time.sleep(keyboard_command_wait_time)
-
-        pyautogui.moveTo(screenWidth*0.5, screenHeight*.9)
-
-        # Send keyboard shortcuts to select release configuration
-        pyautogui.hotkey('alt')
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.hotkey('b')
-        time.sleep(keyboard_command_wait_time)
-
-        hasCompileOption = vs_has_compile_option(vsSearchRegion)
-
-        pyautogui.press("up")
-        time.sleep(keyboard_command_wait_time)
-
-        if hasCompileOption:
-            pyautogui.press("up")
-            time.sleep(keyboard_command_wait_time)
-            pyautogui.press("up")
-            time.sleep(keyboard_command_wait_time)
-
-        pyautogui.press("enter")
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.press("down")
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.press("down")
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.press("escape")
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.press("escape")
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.press("escape")
-        time.sleep(keyboard_command_wait_time)
-
-        # Send keyboard shortcuts to start distributed build
-        pyautogui.hotkey('alt')
-        time.sleep(keyboard_command_wait_time)
-        pyautogui.hotkey('b')
-        time.sleep(keyboard_command_wait_time)
-
-        hasDistributedOption = vs_has_distributed_option(vsSearchRegion)
-
-        if hasDistributedOption:
-            pyautogui.press("down")
-            time.sleep(keyboard_command_wait_time)
-            pyautogui.press("down")
-            time.sleep(keyboard_command_wait_time)
-            pyautogui.press("down")
-            time.sleep(keyboard_command_wait_time)
-
-        pyautogui.press("enter")
-        time.sleep(keyboard_command_wait_time)
-
-        print("Visual Studio build opened and distributed build configuration selected.")
-    else:
-        print("Error: No .sln file found in the build directory.")
+    profile_width = max(len("Profile"), *(len(row[0]) for row in rows))
+    lines = [f"{'Profile':<{profile_width}}  {'Status':<9}  {'Time':>6}  Last output"]
+    lines += [f"{profile:<{profile_width}}  {status:<9}  {elapsed:>6}  {last_line}" for profile, status, elapsed, last_line in rows]
 
-def generate_and_build_mc_platform(mc_platform="win32"):
-    gen_proj_script = ""
-    generate_and_build_command = []
-    gen_proj_directory = "gen_proj"
-
-    if mc_platform.lower() == "win32":
-        gen_proj_script = os.path.join(gen_proj_directory, "win32_renderdragon_x64.py")
-        generate_and_build_command = ["python", gen_proj_script, "--config", "Release", "--build"]
-    elif mc_platform.lower() == "uwp":
-        gen_proj_script = os.path.join(gen_proj_directory, "uwp_renderdragon_x64_win10.py")
-        generate_and_build_command = ["python", gen_proj_script, "--config", "Release", "--build"]
-    elif mc_platform.lower() == "android":
-        gen_proj_script = os.path.join(gen_proj_directory, "android_ogl_arm64-v8a_google.py")
-        generate_and_build_command = ["python", gen_proj_script, "--config", "Release", "--build", "--package"]
-    else:
-        print(f"Error: '{mc_platform}' is not a valid platform, choose between (Win32, UWP and Android)")
-        return
+    # Move back over the previous table so it updates in place
+    if redraw:
+        sys.stdout.write(f"\033[{len(lines)}F\033[J")
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
-    # todo: add linux / macOS support
-    if platform.system() == "Windows":
-        generate_and_build_command = ["start", "cmd", "/k"] + generate_and_build_command
+async def run_profile_command(profile, repo_path, command_args, semaphore, progress, log_dir):
+    import asyncio
 
-    subprocess.Popen(generate_and_build_command, cwd=get_repo_path(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, shell=True)
+    state = progress[profile]
 
-def run_command(command, max_time=50, max_retries=3):
-    retries = 0
+    async with semaphore:
+        state["status"] = "running"
+        state["start_time"] = time.monotonic()
+        state["error_seen"] = False
 
-    while retries <= max_retries:
-        output = ""
+        # Each repo runs in its own gith process, pinned to its profile. Unbuffered, so the table shows its latest line
+        # instead of waiting for a full pipe buffer
+        env = dict(os.environ, GITH_PROFILE=profile, PYTHONUNBUFFERED="1")
+        gith_command = [sys.executable, os.path.abspath(__file__)] + command_args
+        log_path = os.path.join(log_dir, f"all-{re.sub(r'[^A-Za-z0-9_.-]', '_', profile)}.log")
+        state["log_path"] = log_path
 
         try:
-            subprocess.run(command, cwd=get_repo_path(), universal_newlines=True, timeout=max_time)
-        except subprocess.TimeoutExpired:
-            if (retries + 1) < max_retries:
-                retries += 1
-                print(f"\n\nCommand timed out. (Attempt {retries}) Retrying...")
-                continue
-            else:
-                break
-        except FileNotFoundError:
-            print(f"Error: '{command} is not valid command, cannot find file")
-        
-        return output
-            
-    print(f"Command failed after {max_retries} retries.")
-    return "^#FAILURE^#"
+            process = await asyncio.create_subprocess_exec(*gith_command, cwd=repo_path, env=env, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError as e:
+            state["status"] = "failed"
+            state["last_line"] = str(e)
+            state["end_time"] = time.monotonic()
+            return
 
-def get_git_command(args):
-    repo_path = get_repo_path()
-    return ["git", "-C", repo_path] + args
+        with open(log_path, "wb") as log_file:
+            partial_line = b""
+            while True:
+                chunk = await process.stdout.read(4096)
+                if not chunk:
+                    # The last line may not end with a newline
+                    lines = [partial_line]
+                else:
+                    log_file.write(chunk)
+                    lines = re.split(rb"[\r\n]", partial_line + chunk)
+                    partial_line = lines.pop()
+
+                for line in lines:
+                    if line.strip():
+                        state["last_line"] = line.decode(errors="replace").strip()
+                        state["output"].append(state["last_line"])
+                        # gith commands report failures by printing errors rather than exit codes. Checked per line,
+                        # since the output buffer only keeps the last few lines
+                        if state["last_line"].startswith("Error:"):
+                            state["error_seen"] = True
+
+                if not chunk:
+                    break
+
+        await process.wait()
+
+        failed = process.returncode != 0 or state["error_seen"]
+        state["status"] = "failed" if failed else "done"
+        state["end_time"] = time.monotonic()
+
+async def run_all_profiles(profile_repos, command_args, jobs):
+    import asyncio
+
+    log_dir = os.path.join(GITH_STATE_DIR, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    semaphore = asyncio.Semaphore(jobs)
+    progress = {profile: {"status": "queued", "start_time": None, "end_time": None, "last_line": "", "output": deque(maxlen=20), "log_path": ""} for profile, _ in profile_repos}
+
+    tasks = [asyncio.create_task(run_profile_command(profile, repo_path, command_args, semaphore, progress, log_dir)) for profile, repo_path in profile_repos]
+
+    # Only redraw in place on a terminal, otherwise print the table once at the end
+    interactive = sys.stdout.isatty()
+    if interactive:
+        print_all_progress_table(progress, False)
+    while not all(task.done() for task in tasks):
+        await asyncio.wait(tasks, timeout=1)
+        if interactive:
+            print_all_progress_table(progress, True)
+
+    if not interactive:
+        print_all_progress_table(progress, False)
+
+    return progress
+
+# Shortcut macros, each one is only resolved when a shortcut uses it. None of them start a git process
+TEMPLATE_VARIABLES = {
+    "repo_path": get_repo_path,
+    "branch": get_current_branch_name,
+    "main_branch": get_branch_name,
+    "remote": get_remote_name,
+    "profile": get_current_profile,
+    "sln_path": lambda: find_sln_file(os.path.join(get_repo_path(), "build")),
+    "head_sha": lambda: resolve_git_ref("HEAD"),
+}
+
+# Longest names first, so a macro is never cut short by another one that starts the same way
+TEMPLATE_PATTERN = re.compile(r"\^#(" + "|".join(sorted(TEMPLATE_VARIABLES, key=len, reverse=True)) + ")")
+
+def compile_template(template):
+    # Split a shortcut into literal text and macro names once, compiled templates live as long as the parsed config
+    compiled_templates = _config_store["templates"]
+    if template not in compiled_templates:
+        parts = TEMPLATE_PATTERN.split(template)
+        # Odd parts are the captured macro names
+        compiled_templates[template] = [(index % 2 == 1, part) for index, part in enumerate(parts) if part]
+
+    return compiled_templates[template]
+
+def get_template_variable(name):
+    if name not in _template_values:
+        value = TEMPLATE_VARIABLES[name]()
+        if value is None:
+            print(f"Error: Unable to resolve ^#{name}, it is left empty")
+        _template_values[name] = value or ""
+
+    return _template_values[name]
 
-def get_current_branch_name():
-    repo_path = get_repo_path()
-    if not repo_path:
-        return None
+# Function to replace variables in the shortcut command
+def replace_variables(command):
+    return "".join(get_template_variable(part) if is_variable else part for is_variable, part in compile_template(command))
 
+def parse_shortcut_stages(shortcut_command):
+    # Structured shortcuts are a JSON list of steps run in order, a step is an argv list, a command string
+    # or {"parallel": [steps]}. Anything else, such as `[ -f x ] && make`, is a plain string shortcut with a single step
     try:
-        git_command = ["git", "-C", repo_path, "rev-parse", "--abbrev-ref", "HEAD"]
-        result = subprocess.run(git_command, capture_output=True, text=True)
-        if result.returncode == 0:
-            return result.stdout.strip()
-    except subprocess.CalledProcessError:
+        steps = json.loads(shortcut_command) if shortcut_command.lstrip().startswith("[") else None
+    except ValueError:
+        steps = None
+
+    if not isinstance(steps, list):
+        return [[shortcut_command]]
+
+    if not steps:
+        print("Error: Structured shortcuts need at least one step")
         return None
-    
-    return None
 
-def get_status_files():
-    # Logic to only add non-submodule changes
-    repo_path = get_repo_path()
-    status_command = ["git", "status"]
+    stages = []
+    for step in steps:
+        stage = step["parallel"] if isinstance(step, dict) and isinstance(step.get("parallel"), list) else [step]
+        if not stage:
+            print("Error: Parallel shortcut groups need at least one step")
+            return None
 
-    status_files = subprocess.Popen(status_command, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
-    status_files, stderr = status_files.communicate()
-    if status_files is not None:
-        status_files = status_files.decode()
-        status_files = status_files.replace("modified:", "")
-        status_files = status_files.split('\n')
+        for parallel_step in stage:
+            is_argv = isinstance(parallel_step, list) and parallel_step and all(isinstance(arg, str) for arg in parallel_step)
+            if not is_argv and not (isinstance(parallel_step, str) and parallel_step.strip()):
+                print(f"Error: Invalid shortcut step {json.dumps(parallel_step)}, use an argv list, a command string or {{\"parallel\": [steps]}}")
+                return None
+        stages.append(stage)
 
-        return_files = []
-        for file in status_files:
-            file = file.lstrip()
-            file_path = os.path.join(get_repo_path(), file)
+    return stages
 
-            if os.path.isfile(file_path):
-                return_files.append(file_path)
+def split_shortcut_command(command):
+    if platform.system() != "Windows":
+        return shlex.split(command)
 
-        return return_files
-    
-    return []
+    # posix splitting would eat the backslashes in Windows paths
+    return [arg[1:-1] if len(arg) > 1 and arg[0] == arg[-1] and arg[0] in "\"'" else arg for arg in shlex.split(command, posix=False)]
 
-def add_without_submodules():
-    status_files = get_status_files()
+def get_process_group_args():
+    # Popen arguments that start a command in its own process group, so stop_process_group reaches its children too
+    if platform.system() == "Windows":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
 
-    for file in status_files:
-        run_git_command(["add", file])
+def stop_process_group(process):
+    # Stops the command and every process it started, such as the commands of a shell or a nested gith call
+    if platform.system() == "Windows":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)], capture_output=True)
+        process.wait()
+        return
 
-def remove_duplicate_sections(file_path):
-    pattern = r"\[.*\]"
+    for stop_signal in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, stop_signal)
+        except ProcessLookupError:
+            break
 
-    with open(file_path, 'r') as f:
-        lines = f.readlines()
+        try:
+            process.wait(5)
+            break
+        except subprocess.TimeoutExpired:
+            pass
 
-    with open(file_path, 'w') as f:
-        section_names = set()
-        for line in lines:
-            if re.match(pattern, line):
-                section_name = line.strip()
-                if section_name in section_names:
-                    continue  # Skip duplicate section
-                else:
-                    section_names.add(section_name)
-            f.write(line)
+def start_shortcut_step(step, popen_args=None):
+    # Raises ValueError when the step is empty once its macros are replaced
+    popen_args = popen_args or {}
+    if isinstance(step, str):
+        command = replace_variables(step)
 
-def read_gith_config():
-    config = configparser.ConfigParser()
-    if os.path.exists(GITH_CONFIG_FILE):
-        remove_duplicate_sections(GITH_CONFIG_FILE)
+        # Only commands that need shell features pay for a shell
+        if any(character in SHELL_METACHARACTERS for character in command):
+            return subprocess.Popen(command, shell=True, **popen_args)
 
         try:
-            config.read(GITH_CONFIG_FILE)
-        except configparser.MissingSectionHeaderError:
-            # Handle improperly formatted .githconfig file
-            print(f"Invalid .githconfig file. Creating a new one with default section headers.")
-            with open(GITH_CONFIG_FILE, "w") as config_file:
-               config.write(config_file)
+            argv = split_shortcut_command(command)
+        except ValueError:
+            return subprocess.Popen(command, shell=True, **popen_args)
     else:
-        # Create the .githconfig file with a default section header
-        config.add_section("default")
-        with open(GITH_CONFIG_FILE, "w") as config_file:
-            config.write(config_file)
+        argv = [replace_variables(arg) for arg in step]
 
-    return config
+    if not argv or not argv[0]:
+        raise ValueError("the command is empty")
 
-def clean_submodules():
-    # Get the list of submodules
-    result = subprocess.run(['git', 'submodule', '--quiet', 'foreach', 'echo $path'], capture_output=True, text=True)
-    submodule_paths = result.stdout.strip().split('\n')
-
-    # Clean each submodule
-    for path in submodule_paths:
-        submodule_dir = path.strip()
-        if os.path.exists(submodule_dir):
-            subprocess.run(['git', 'clean', '-ffdx'], cwd=submodule_dir)
-            subprocess.run(['git', 'restore', '--staged', '.'], cwd=submodule_dir)
-            subprocess.run(['git', 'checkout', '.'], cwd=submodule_dir)
-
-def clean_non_git_files():
-    clean_command = get_git_command(["clean", "-ffdx"])
-
-    process = subprocess.Popen(clean_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, universal_newlines=True)
-
-    # Read the stdout and stderr streams line by line
-    stdout, stderr = process.communicate()
-    for line in stdout.splitlines():
-        print(line)
-        # Check if the prompt "Would you like to try again (y/n)" is present
-        if "(y/n)" in line:
-            # Automatically send "n" as the response
-            process.stdin.write("n\n")
-            process.stdin.flush()
-    
-    # Wait for the process to finish
-    process.wait()
+    # Run nested gith calls with this interpreter instead of going through the gith/gith.bat wrapper
+    if argv[0] == "gith":
+        argv = [sys.executable, os.path.abspath(__file__)] + argv[1:]
 
-    clean_submodules()
+    try:
+        return subprocess.Popen(argv, **popen_args)
+    except OSError:
+        if isinstance(step, str):
+            # Not a program, most likely a shell builtin
+            return subprocess.Popen(command, shell=True, **popen_args)
+        raise
+
+def get_shortcut_step_name(step):
+    return step if isinstance(step, str) else " ".join(step)
+
+def run_shortcut_stage(stage):
+    # Parallel steps get their own process groups so a failing sibling can stop them completely, a single step stays
+    # in the terminal's group so it can still read keyboard input
+    popen_args = get_process_group_args() if len(stage) > 1 else {}
+    processes = []
+
+    # Earlier steps may have committed or switched branches, so macros such as ^#branch are resolved again
+    _template_values.clear()
+    executor = ThreadPoolExecutor(max_workers=len(stage))
+    try:
+        for step in stage:
+            start_time = time.perf_counter()
+            try:
+                processes.append((step, start_time, start_shortcut_step(step, popen_args)))
+            except (OSError, ValueError) as e:
+                print(f"Error: Unable to run '{get_shortcut_step_name(step)}': {e}")
+                return False
+
+        # Fail fast, the first step that fails stops the ones still running next to it
+        pending = {executor.submit(process.wait): (step, start_time) for step, start_time, process in processes}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                step, start_time = pending.pop(future)
+                returncode = future.result()
+                record_timing_span(get_shortcut_step_name(step), "shortcut", start_time, {"returncode": returncode})
+                if returncode != 0:
+                    print(f"Error: '{get_shortcut_step_name(step)}' failed with exit code {returncode}")
+                    return False
 
-# Function to replace variables in the shortcut command
-def replace_variables(command):
-    count = 0
-    while command.find("^#") != -1 and count < 20:
-        count += 1
-        if command.find("^#repo_path") != -1:
-            command = command.replace("^#repo_path", get_repo_path())
+        return True
+    finally:
+        for step, _, process in processes:
+            if process.poll() is None:
+                print(f"Stopping '{get_shortcut_step_name(step)}'")
+                if popen_args:
+                    stop_process_group(process)
+                else:
+                    process.terminate()
+                    try:
+                        process.wait(5)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+        executor.shutdown(wait=False)
+
+def run_shortcut_stages(stages):
+    stage_durations = []
+    passed = True
+
+    for index, stage in enumerate(stages):
+        start_time = time.perf_counter()
+        passed = run_shortcut_stage(stage)
+        stage_durations.append((" & ".join(get_shortcut_step_name(step) for step in stage), time.perf_counter() - start_time))
+        if not passed:
+            if index + 1 < len(stages):
+                print(f"Skipping the remaining {len(stages) - index - 1} shortcut steps")
+            break
 
-    return command
+    if len(stages) > 1 or len(stages[0]) > 1:
+        print("\nShortcut step timings:")
+        for name, duration in stage_durations:
+            print(f"{duration:>8.2f}s  {name}")
+
+    return passed
 # ------- End Helpers -------
 
 # ======= Commands =======
+@timed_step
 def submodule_command():
-    run_git_command(["submodule", "sync"])
-    run_git_command(["submodule", "update", "--init", "--recursive"], 550, 0)
-    return run_git_command(["submodule", "update", "--init", "--recursive"], 20, 1)
+    run_git_command(["submodule", "sync", "--recursive"])
+
+    # Register every submodule up front, so the parallel updates never write the superproject config at the same time
+    run_git_command(["submodule", "init"])
+
+    return update_submodules(get_profile_option("submodule_jobs"), get_profile_option("submodule_cache"))
 
 def commit_command(message):
     if message == "":
@@ -570,17 +2846,19 @@ def push_command(force):
     else:
         run_git_command(["push", remote_name, branch_name])
 
+@timed_step
 def fetch_command(rebase):
     main_branch = get_branch_name()
     fetch_branch = get_current_branch_name()
     remote_name = get_remote_name()
     passed = False
 
-    status_file_count = len(get_status_files())
+    local_changes = [entry for entry in get_status_entries() if not entry.is_submodule]
+    status_file_count = len(local_changes)
 
     if status_file_count > 0:
         print("Stashing local changes")
-        add_without_submodules()
+        add_without_submodules(local_changes)
         run_git_command(["stash"])
 
     print(f"\nChecking out main branch: {main_branch}")
@@ -589,12 +2867,8 @@ def fetch_command(rebase):
         print(f"Error: unable to checkout branch '{main_branch}'")
         return
 
-    print(f"\nRunning 'git remote prune {remote_name}'")
-    run_git_command(["remote", "prune", remote_name], 35, 1)
-
     print(f"\nFetching latest changes for branch: {main_branch}")
-    run_git_command(["fetch", remote_name, main_branch], 550, 0)
-    passed = run_git_command(["fetch", remote_name, main_branch], 50, 0)
+    passed = fetch_remote_branch(remote_name, main_branch)
     if not passed:
         print(f"Error: Unable to fetch branch '{main_branch}' at remote '{remote_name}'")
         return
@@ -614,7 +2888,13 @@ def fetch_command(rebase):
     else:
         print(f"\nMerging {main_branch} into {fetch_branch}")
         passed = run_git_command(["merge", main_branch], 300, 0)
-    
+
+    if not passed:
+        print(f"Error: Unable to update {fetch_branch} with {main_branch}")
+        if status_file_count > 0:
+            print("Your local changes are still stashed, run `git stash pop` once the conflicts are resolved")
+        return
+
     if status_file_count > 0:
         print("\nAuto merging stashed changes")
         passed = run_git_command(["stash", "pop"])
@@ -633,16 +2913,20 @@ def fetch_command(rebase):
     print("\nCleaning non-git files")
     clean_non_git_files()
 
+@timed_step
 def fetch_branch_command(fetch_branch):
     if fetch_branch == "":
         print("Error: The branch name to fetch was not specified")
         return
 
+    if get_profile_option("branch_mode") == "worktree":
+        worktree_fetch_branch_command(fetch_branch)
+        return
+
     remote_name = get_remote_name()
     
     print(f"Fetching fetch branch: {fetch_branch}")
-    run_git_command(["fetch", remote_name, fetch_branch], 550, 0)
-    passed = run_git_command(["fetch", remote_name, fetch_branch], 50, 0)
+    passed = fetch_remote_branch(remote_name, fetch_branch)
     if not passed:
         print(f"Error: unable to fetch branch '{fetch_branch}'")
         return
@@ -659,11 +2943,16 @@ def fetch_branch_command(fetch_branch):
     print("\nCleaning non-git files")
     clean_non_git_files()
 
+@timed_step
 def branch_command(branch_name):
     if branch_name == "":
         print("Error: The branch name was not specified")
         return
 
+    if get_profile_option("branch_mode") == "worktree":
+        worktree_branch_command(branch_name)
+        return
+
     main_branch = get_branch_name()
     remote_name = get_remote_name()
     passed = False
@@ -674,12 +2963,8 @@ def branch_command(branch_name):
         print(f"Error: unable to checkout branch '{main_branch}'")
         return
 
-    print(f"\nRunning 'git remote prune {remote_name}'")
-    run_git_command(["remote", "prune", remote_name], 35, 1)
-
     print(f"\nFetching latest changes for branch: {main_branch}")
-    run_git_command(["fetch", remote_name, main_branch], 550, 0)
-    passed = run_git_command(["fetch", remote_name, main_branch], 50, 0)
+    passed = fetch_remote_branch(remote_name, main_branch)
     if not passed:
         print(f"Error: Unable to fetch branch '{main_branch}' at remote '{remote_name}'")
         return
@@ -706,6 +2991,341 @@ def branch_command(branch_name):
     print("\nCleaning non-git files")
     clean_non_git_files()
 
+@timed_step
+def worktree_branch_command(branch_name):
+    main_branch = get_branch_name()
+    remote_name = get_remote_name()
+
+    # An existing worktree keeps its build folder, switching to it needs no fetch, reset or clean
+    worktree_path = get_branch_worktree(branch_name)
+    if worktree_path:
+        print(f"Branch '{branch_name}' already has a worktree")
+        set_repo_path(worktree_path)
+        print(f"\nSwitched the '{get_current_profile()}' profile to worktree: {worktree_path}")
+        print(f"Run `cd {worktree_path}` to start working in it")
+        return
+
+    print(f"Fetching latest changes for branch: {main_branch}")
+    passed = fetch_remote_branch(remote_name, main_branch)
+    if not passed:
+        print(f"Error: Unable to fetch branch '{main_branch}' at remote '{remote_name}'")
+        return
+
+    worktree_path = get_new_worktree_path(branch_name)
+    print(f"\nCreating worktree for new branch {branch_name} at {worktree_path}")
+    passed = run_git_command(["worktree", "add", "--no-track", "-B", branch_name, worktree_path, f"{remote_name}/{main_branch}"])
+    if not passed:
+        print("Error: unable to create worktree")
+        return
+
+    switch_to_worktree(worktree_path)
+
+@timed_step
+def worktree_fetch_branch_command(fetch_branch):
+    remote_name = get_remote_name()
+
+    print(f"Fetching fetch branch: {fetch_branch}")
+    passed = fetch_remote_branch(remote_name, fetch_branch)
+    if not passed:
+        print(f"Error: unable to fetch branch '{fetch_branch}'")
+        return
+
+    worktree_path = get_branch_worktree(fetch_branch)
+    if worktree_path:
+        print(f"\nResetting worktree {worktree_path} to remote fetch branch {fetch_branch}")
+        passed = run_git_command(["-C", worktree_path, "reset", "--hard", f"{remote_name}/{fetch_branch}"])
+    else:
+        worktree_path = get_new_worktree_path(fetch_branch)
+        print(f"\nCreating worktree for fetch branch {fetch_branch} at {worktree_path}")
+        passed = run_git_command(["worktree", "add", "-B", fetch_branch, worktree_path, f"{remote_name}/{fetch_branch}"])
+
+    if not passed:
+        print(f"Error: unable to update the worktree for '{fetch_branch}'")
+        return
+
+    switch_to_worktree(worktree_path)
+
+def worktree_command(action, branch_name):
+    if action == "" or action == "list":
+        for worktree in get_worktrees():
+            branch = worktree.get("branch", "detached").replace("refs/heads/", "")
+            print(f"{branch}: {worktree['worktree']}")
+    elif action == "remove":
+        worktree_path = get_branch_worktree(branch_name)
+        if not worktree_path:
+            print(f"Error: No worktree found for branch '{branch_name}'")
+            return
+
+        if os.path.normcase(os.path.abspath(worktree_path)) == os.path.normcase(os.path.abspath(get_repo_path())):
+            print("Error: Cannot remove the worktree you are currently in")
+            return
+
+        # --force twice also removes worktrees with submodules and build outputs
+        if run_git_command(["worktree", "remove", "--force", "--force", worktree_path]):
+            print(f"Removed worktree for branch '{branch_name}'")
+    else:
+        print(f"Error: '{action}' is not a valid worktree action, choose between (list, remove)")
+
+def timings_command(command_name, count):
+    # Compares the latest run of a command with the average of its previous runs
+    history = [entry for entry in read_timing_history() if not command_name or entry["command"] == command_name]
+    if not history:
+        print("No timings recorded yet" + (f" for '{command_name}'" if command_name else ""))
+        return
+
+    history = history[-count:]
+    latest = history[-1]
+    previous = history[:-1]
+
+    print(f"Latest: gith {latest['argv']} ({time.strftime('%Y-%m-%d %H:%M', time.localtime(latest['time']))}) took {latest['duration']:.2f}s")
+    print(f"\n{'Step':<60} {'Latest':>9} {'Average':>9} {'Runs':>5}")
+    for name, duration in sorted(latest["steps"].items(), key=lambda item: item[1], reverse=True):
+        durations = [entry["steps"][name] for entry in previous if name in entry["steps"]]
+        average = f"{sum(durations) / len(durations):>8.2f}s" if durations else f"{'-':>9}"
+        short_name = name if len(name) <= 60 else name[:57] + "..."
+        print(f"{short_name:<60} {duration:>8.2f}s {average} {len(durations) + 1:>5}")
+
+def bench_command(file_count, submodule_count, runs, output_path, baseline_path, keep):
+    # The timed steps change the first two files of the synthetic repo
+    if runs < 1 or file_count < 2 or submodule_count < 0:
+        print("Error: The benchmark needs at least 1 run, 2 files and 0 submodules")
+        return False
+
+    bench_dir = tempfile.mkdtemp(prefix="gith-bench-")
+    env = get_bench_env(bench_dir)
+    results = {}
+    passed = True
+
+    try:
+        print(f"Creating a synthetic repo with {file_count} files and {submodule_count} submodules in {bench_dir}")
+        source_dir, workspace_dir = create_bench_repo(bench_dir, env, file_count, submodule_count)
+        run_bench_gith(["main-branch", "main"], env, workspace_dir)
+
+        steps = get_bench_steps(source_dir, workspace_dir, env, file_count)
+        durations = {name: [] for name, _, _ in steps}
+
+        # Steps run in order every round, so each one starts from the state a real session would leave
+        for run in range(runs):
+            for name, setup, get_args in steps:
+                if setup:
+                    setup(run)
+
+                duration, step_passed = run_bench_gith(get_args(run), env, workspace_dir)
+                passed = passed and step_passed
+                durations[name].append(duration)
+                print(f"Run {run + 1}/{runs}: {name:<8} {duration:>7.3f}s")
+    except (RuntimeError, OSError) as e:
+        print(f"Error: Unable to run the benchmark: {e}")
+        return False
+    finally:
+        if keep:
+            print(f"Benchmark repos kept in {bench_dir}")
+        else:
+            shutil.rmtree(bench_dir, ignore_errors=True)
+
+    for name, step_durations in durations.items():
+        sorted_durations = sorted(step_durations)
+        results[name] = {
+            "runs": len(step_durations),
+            "min": round(sorted_durations[0], 4),
+            "median": round(sorted_durations[len(sorted_durations) // 2], 4),
+            "mean": round(sum(step_durations) / len(step_durations), 4),
+            "max": round(sorted_durations[-1], 4),
+        }
+
+    report = {
+        "time": time.time(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "files": file_count,
+        "submodules": submodule_count,
+        "passed": passed,
+        "results": results,
+    }
+
+    print(f"\n{'Command':<10} {'Min':>8} {'Median':>8} {'Max':>8}")
+    for name, result in results.items():
+        print(f"{name:<10} {result['min']:>7.3f}s {result['median']:>7.3f}s {result['max']:>7.3f}s")
+
+    # Compare medians with an earlier report, so CI can fail on a slowdown
+    if baseline_path:
+        baseline = None
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)["results"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error: Unable to read baseline {baseline_path}: {e}")
+            passed = False
+
+        report["regressions"] = []
+        for name, result in results.items():
+            if baseline and name in baseline:
+                change = result["median"] / baseline[name]["median"] - 1 if baseline[name]["median"] else 0
+                if change > BENCH_REGRESSION_THRESHOLD:
+                    report["regressions"].append(name)
+                    print(f"Regression: {name} median is {change:.0%} slower than the baseline")
+
+        passed = passed and not report["regressions"]
+
+    report["passed"] = passed
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output_path}")
+    else:
+        print("\n" + json.dumps(report))
+
+    return passed
+
+def daemon_command(action):
+    if not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"):
+        print("Error: The gith daemon needs Unix sockets and fork, it is not supported on this platform")
+        return
+
+    pid = get_running_pid(DAEMON_PID_FILE)
+
+    if action == "" or action == "status":
+        if pid:
+            print(f"gith daemon is running (pid {pid})")
+        else:
+            print("gith daemon is not running")
+    elif action == "start":
+        if pid:
+            print(f"gith daemon is already running (pid {pid})")
+            return
+
+        start_background_gith(["daemon", "run"])
+        if wait_for_condition(lambda: get_running_pid(DAEMON_PID_FILE) and os.path.exists(os.path.join(GITH_STATE_DIR, DAEMON_SOCKET_FILE)), 10):
+            print(f"Started gith daemon (pid {get_running_pid(DAEMON_PID_FILE)})")
+        else:
+            print("Error: gith daemon did not start")
+    elif action == "stop":
+        if not pid:
+            print("gith daemon is not running")
+            return
+
+        os.kill(pid, signal.SIGTERM)
+        if wait_for_condition(lambda: not get_running_pid(DAEMON_PID_FILE), 10):
+            print("Stopped gith daemon")
+        else:
+            print(f"Error: gith daemon (pid {pid}) did not stop")
+    elif action == "run":
+        run_daemon()
+    else:
+        print(f"Error: '{action}' is not a valid daemon action, choose between (start, stop, status)")
+
+def tune_command(preset, apply):
+    if preset == "":
+        preset = "safe"
+
+    if preset not in TUNE_PRESETS:
+        print(f"Error: '{preset}' is not a valid preset, choose between ({', '.join(TUNE_PRESETS)})")
+        return
+
+    repo_path = get_repo_path()
+    if not find_git_dirs(repo_path)[0]:
+        print(f"Error: '{repo_path}' is not a git repo")
+        return
+
+    # The full preset also includes everything in the safe preset
+    settings = [setting for setting in TUNE_SETTINGS if TUNE_PRESETS.index(setting.preset) <= TUNE_PRESETS.index(preset)]
+    repo_paths = [repo_path] + [os.path.join(repo_path, path) for path in get_submodule_paths()]
+
+    missing = []
+    print(f"{'Repo':<40} {'Setting':<24} Status")
+    for path in repo_paths:
+        state = get_tune_state(path)
+        if state is None:
+            print(f"Skipping '{path}', it is not checked out")
+            continue
+
+        display_path = os.path.relpath(path, repo_path)
+        for setting in settings:
+            if not setting.supported:
+                status = "not supported on this platform"
+            elif setting.check(state):
+                status = "ok"
+            else:
+                status = "missing"
+                missing.append((path, setting))
+            print(f"{display_path:<40} {setting.name:<24} {status}")
+
+    if not missing:
+        print(f"\nEverything in the '{preset}' preset is already set up")
+        return
+
+    if not apply:
+        print(f"\n{len(missing)} settings are missing, run `gith tune {preset} apply` to set them up")
+        return
+
+    print("\nTiming status and checkout before tuning")
+    before = benchmark_repo_operations(repo_path)
+
+    failed_count = 0
+    for path, setting in missing:
+        print(f"\nSetting up {setting.name} in {os.path.relpath(path, repo_path)}")
+        for args in setting.apply:
+            # Writing a commit-graph for a large repo prints nothing for a while, so there is no inactivity timeout
+            if not run_git_command(["-C", path] + args, 0, 0):
+                print(f"Error: Unable to set up {setting.name} in '{path}'")
+                failed_count += 1
+                break
+
+    after = benchmark_repo_operations(repo_path)
+
+    print(f"\n{'Operation':<10} {'Before':>9} {'After':>9}")
+    for operation in ("status", "checkout"):
+        before_time = f"{before[operation] * 1000:>7.1f}ms" if before[operation] is not None else f"{'-':>9}"
+        after_time = f"{after[operation] * 1000:>7.1f}ms" if after[operation] is not None else f"{'-':>9}"
+        print(f"{operation:<10} {before_time} {after_time}")
+
+    if failed_count:
+        print(f"\nError: {failed_count} settings could not be set up")
+
+def prefetch_command(action, interval_minutes):
+    pid = get_running_pid(PREFETCH_PID_FILE)
+
+    if action == "" or action == "status":
+        if pid:
+            print(f"Background prefetch is running (pid {pid}), log: {os.path.join(GITH_STATE_DIR, 'logs', 'prefetch.log')}")
+        else:
+            print("Background prefetch is not running")
+
+        for repo_dir, prefetch_times in read_state_file(PREFETCH_STATE_FILE, {}).items():
+            for branch, prefetch_time in prefetch_times.items():
+                print(f"{branch} in {repo_dir} prefetched {(time.time() - prefetch_time) / 60:.0f} minutes ago")
+    elif action == "start":
+        if pid:
+            print(f"Background prefetch is already running (pid {pid})")
+            return
+
+        if not get_profile_repo_paths():
+            print("Error: No profiles have a repo set, run `gith repo` from a repo to set one for the current profile")
+            return
+
+        start_background_gith(["prefetch", "loop", "--interval", str(interval_minutes)])
+        if wait_for_condition(lambda: get_running_pid(PREFETCH_PID_FILE), 10):
+            print(f"Started background prefetch every {interval_minutes} minutes for the repos set with `gith repo`")
+        else:
+            print("Error: Background prefetch did not start")
+    elif action == "stop":
+        if not pid:
+            print("Background prefetch is not running")
+            return
+
+        os.kill(pid, signal.SIGTERM)
+        if wait_for_condition(lambda: not get_running_pid(PREFETCH_PID_FILE), 10):
+            print("Stopped background prefetch")
+        else:
+            print(f"Error: Background prefetch (pid {pid}) did not stop")
+    elif action == "run":
+        prefetch_repo()
+    elif action == "loop":
+        run_prefetch_loop(interval_minutes)
+    else:
+        print(f"Error: '{action}' is not a valid prefetch action, choose between (start, stop, status, run)")
+
 def add_profile_command(profile_name, copy):
     if profile_name == "":
         print("Error: There was no profile name specified")
@@ -728,8 +3348,7 @@ def add_profile_command(profile_name, copy):
                     value = config.get(current_profile, option)
                     config.set(profile_name, option, value)
 
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
     set_current_profile(profile_name)
     print(f"Added new profile: '{profile_name}'")
@@ -752,7 +3371,7 @@ def add_shortcut_command(shortcut_name, shortcut_command, current=False):
     if shortcut_name == "":
         print("Error: The shortcut name was not specified")
         return
-    elif shortcut_command == "":
+    elif shortcut_command.strip() == "":
         print("Error: The shortcut command was not specified")
         return
 
@@ -769,12 +3388,14 @@ def add_shortcut_command(shortcut_name, shortcut_command, current=False):
     if not config.has_section(current_profile):
         config.add_section(current_profile)
 
+    if parse_shortcut_stages(shortcut_command) is None:
+        return
+
     full_shortcut_name = SHORTCUT_PREFIX + shortcut_name
 
     config.set(current_profile, full_shortcut_name, shortcut_command)
 
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
     print(f"Added shortcut '{shortcut_name}' to profile '{current_profile}'")
 
@@ -801,8 +3422,7 @@ def remove_shortcut_command(shortcut_name, current=False):
     
     config.remove_option(current_profile, full_shortcut_name)
 
-    with open(GITH_CONFIG_FILE, "w") as config_file:
-        config.write(config_file)
+    write_gith_config(config)
 
     print(f"\nRemoved shortcut {shortcut_name} from profile {current_profile}")
 
@@ -824,12 +3444,55 @@ def execute_shortcut_command(shortcut_name, printError=True):
 
     shortcut_command = config.get(current_profile, full_shortcut_name)
     shortcut_command = shortcut_command.replace(SHORTCUT_PREFIX, "")
-    shortcut_command = replace_variables(shortcut_command)
-    print(f"\nExecuting shortcut '{shortcut_name}': {shortcut_command}")
-    os.system(shortcut_command)
+    print(f"\nExecuting shortcut '{shortcut_name}': {replace_variables(shortcut_command)}")
+
+    stages = parse_shortcut_stages(shortcut_command)
+    if stages is None:
+        return True
+
+    # Shortcuts often call gith again, make sure they see our pending config changes
+    flush_gith_config()
+    run_shortcut_stages(stages)
 
     return True
     
+def all_command(command, command_args, jobs):
+    all_commands = {"fetch": "fetch", "f": "fetch", "clean": "clean", "cl": "clean", "sub-init": "sub-init", "su": "sub-init"}
+    if command not in all_commands:
+        print(f"Error: '{command}' can't be run across profiles, choose between (fetch, clean, sub-init)")
+        return
+
+    profile_repos = []
+    for profile, repo_path in get_profile_repo_paths():
+        if os.path.isdir(repo_path):
+            profile_repos.append((profile, repo_path))
+        else:
+            print(f"Skipping profile '{profile}', repo '{repo_path}' does not exist")
+
+    if not profile_repos:
+        print("Error: No profiles have a repo set, run `gith repo` from a repo to set one for the current profile")
+        return
+
+    if not jobs or jobs < 1:
+        jobs = max(2, (os.cpu_count() or 2) // 2)
+    jobs = min(jobs, len(profile_repos))
+
+    print(f"Running '{all_commands[command]}' in {len(profile_repos)} repos, {jobs} at a time\n")
+
+    if platform.system() == "Windows":
+        # Enables ANSI escape codes in the Windows console for the progress table
+        os.system("")
+
+    # asyncio alone takes longer to import than the rest of gith, so only `gith all` pays for it
+    import asyncio
+    progress = asyncio.run(run_all_profiles(profile_repos, [all_commands[command]] + command_args, jobs))
+
+    for profile, state in progress.items():
+        if state["status"] == "failed":
+            print(f"\nError: '{all_commands[command]}' failed for profile '{profile}', full log: {state['log_path']}")
+            for line in state["output"]:
+                print(f"    {line}")
+
 def print_status_command(all):
     repo_path = get_repo_path()
     branch_name = get_branch_name()
@@ -841,12 +3504,18 @@ def print_status_command(all):
 
     print(f"Current Profile: {current_profile}")
     print(f"Current Repository: {repo_path}")
+    print(f"Current Branch: {get_current_branch_name() or 'Not a git repository'}")
     print(f"Main Branch: {branch_name}")
     print(f"Remote Name: {remote_name}")
 
     if (all == False):
         return
 
+    main_sha = resolve_git_ref(f"refs/heads/{branch_name}")
+    remote_sha = resolve_git_ref(f"refs/remotes/{remote_name}/{branch_name}")
+    print(f"\nLocal {branch_name}: {main_sha[:10] if main_sha else 'Not found'}")
+    print(f"{remote_name}/{branch_name}: {remote_sha[:10] if remote_sha else 'Not found'}")
+
     config = read_gith_config()
     profiles = config.sections()
 
@@ -875,6 +3544,8 @@ def print_status_command(all):
 # ======= Main Logic and Argument Parsing =======
 def init_arg_parser():
     parser = CustomArgumentParser(prog="gith", description="Git Helper")
+    parser.add_argument("--timings", action="store_true", help="Print how long each step took")
+    parser.add_argument("--trace", default=None, help="Write a Chrome trace of each step to this file")
     subparsers = parser.add_subparsers(title="Commands", dest="command")
 
     status_parser = subparsers.add_parser("status", aliases=["s"], help="Show the status of the current profile ---- gith status [all]  ---- display all info")
@@ -882,7 +3553,10 @@ def init_arg_parser():
 
     subparsers.add_parser("sub-init", aliases=["su"], help="Initialize and update Git submodules recursively")
 
-    subparsers.add_parser("clean", aliases=["cl"], help="Clean non-git files (-ffdx)")
+    clean_parser = subparsers.add_parser("clean", aliases=["cl"], help="Clean non-git files (-ffdx) ---- gith clean [full|fast|trash|incremental|snapshot] [--dry-run] [--jobs N]")
+    clean_parser.add_argument("mode", nargs="?", default="", help="full, fast, trash, incremental or snapshot (clean_mode option by default)")
+    clean_parser.add_argument("--dry-run", action="store_true", help="Report what an incremental clean would remove")
+    clean_parser.add_argument("-j", "--jobs", default=None, help="Number of submodules to clean at once (core count by default)")
 
     commit_parser = subparsers.add_parser("commit", aliases=["co"], help="Method which takes a commit message, adds untracked changes and commits ---- gith commit $commit_message")
     commit_parser.add_argument("message", default="", help="Commit message")
@@ -907,6 +3581,22 @@ def init_arg_parser():
     branch_parser = subparsers.add_parser("branch", aliases=["b"], help="Create and switch to a new branch")
     branch_parser.add_argument("name", default="", help="Name of the new branch")
 
+    worktree_parser = subparsers.add_parser("worktree", aliases=["wt"], help="List or remove branch worktrees ---- gith worktree [list|remove $branch_name]")
+    worktree_parser.add_argument("action", nargs="?", default="", help="list or remove")
+    worktree_parser.add_argument("branch", nargs="?", default="", help="Branch of the worktree to remove")
+
+    timings_parser = subparsers.add_parser("timings", aliases=["tm"], help="Compare the latest step timings with previous runs ---- gith timings [$command] [--count N]")
+    timings_parser.add_argument("timed_command", nargs="?", default="", help="Only show runs of this command")
+    timings_parser.add_argument("--count", default=20, help="Number of recent runs to compare")
+
+    bench_parser = subparsers.add_parser("bench", help="Time gith commands on a synthetic repo ---- gith bench [--files N] [--submodules N] [--runs N] [--output $file] [--baseline $file]")
+    bench_parser.add_argument("--files", default=1000, help="Number of files in the synthetic repo")
+    bench_parser.add_argument("--submodules", default=2, help="Number of submodules in the synthetic repo")
+    bench_parser.add_argument("--runs", default=3, help="Number of times each command is timed")
+    bench_parser.add_argument("--output", default=None, help="Write the JSON results to this file")
+    bench_parser.add_argument("--baseline", default=None, help="Fail if a command is slower than in this earlier JSON result")
+    bench_parser.add_argument("--keep", action="store_true", help="Keep the synthetic repos")
+
     shortcut_parser = subparsers.add_parser("add-shortcut", aliases=["asc"], help="Add a new shortcut ---- Specify a name as well as a command for the shortcut")
     shortcut_parser.add_argument("shortcut_name", default="", help="Name of the shortcut")
     shortcut_parser.add_argument("shortcut_command", default="", help="Command associated with the shortcut")
@@ -928,26 +3618,101 @@ def init_arg_parser():
 
     subparsers.add_parser("delete-profile", aliases=["dp"], help="Delete the currently selected profile")
 
+    option_parser = subparsers.add_parser("option", aliases=["op"], help="Set a profile option ---- gith option [$name] [$value]  ----  no value clears the option, no name lists options")
+    option_parser.add_argument("option_name", nargs="?", default="", help="Name of the option")
+    option_parser.add_argument("value", nargs="?", default="", help="Value of the option")
+
     subparsers.add_parser("explorer", aliases=["e"], help="Open a file explorer in the repo directory")
 
-    vsbuild_parser = subparsers.add_parser("build", aliases=["bu"], help="Generate and build a MC platform ---- Options: Win32, UWP, Android")
-    vsbuild_parser.add_argument("mc_platform", nargs="?", default="win32", help="win32, uwp, android")
+    repo_parser = subparsers.add_parser("repo", aliases=["rp"], help="Set the repo of the current profile, used by `gith all` ---- gith repo [$repo_path]  ----  current directory by default")
+    repo_parser.add_argument("repo_path", nargs="?", default="", help="Path to the repo")
+
+    all_parser = subparsers.add_parser("all", help="Run a command in every profile's repo at once ---- gith all [--jobs N] $command  ----  fetch, clean or sub-init")
+    all_parser.add_argument("-j", "--jobs", default=None, help="Number of repos to run at once")
+    all_parser.add_argument("all_command", default="", help="fetch, clean, sub-init")
+    all_parser.add_argument("all_args", nargs=argparse.REMAINDER, help="Arguments for the command")
+
+    vsbuild_parser = subparsers.add_parser("build", aliases=["bu"], help="Generate and build MC platforms ---- Options: Win32, UWP, Android  ----  several platforms build at once")
+    vsbuild_parser.add_argument("mc_platforms", nargs="*", default=["win32"], help="win32, uwp, android")
+    vsbuild_parser.add_argument("-j", "--jobs", default=None, help="Number of platforms to build at once")
 
     vsbuild_parser = subparsers.add_parser("vs-build", aliases=["vsb"], help="Build VS solution in current repo for Release and Distributed, if option is present")
     vsbuild_parser.add_argument("sln_path", nargs="?", default="", help="Specify a specific solution to build with")
 
+    # Internal command used by `gith clean trash` to purge the trash in the background
+    purgetrash_parser = subparsers.add_parser("purge-trash")
+    purgetrash_parser.add_argument("trash_root", default="")
+
+    ocrbench_parser = subparsers.add_parser("ocr-bench", help="Time the vs-build text detectors on a folder of saved .png screenshots")
+    ocrbench_parser.add_argument("screenshot_dir", default="", help="Folder of screenshots")
+
+    tune_parser = subparsers.add_parser("tune", help="Check or set up git features that speed up large repos ---- gith tune [safe|full] [apply]")
+    tune_parser.add_argument("preset", nargs="?", default="", help="safe (default) or full")
+    tune_parser.add_argument("apply", nargs="?", default="", help="Set up the missing features")
+
+    prefetch_parser = subparsers.add_parser("prefetch", help="Fetch main in the background so fetch and branch work locally ---- gith prefetch [start|stop|status|run] [--interval N]")
+    prefetch_parser.add_argument("action", nargs="?", default="", help="start, stop, status or run")
+    prefetch_parser.add_argument("--interval", default=PREFETCH_INTERVAL_MINUTES, help="Minutes between prefetches")
+
+    daemon_parser = subparsers.add_parser("daemon", help="Keep gith loaded in the background for faster commands ---- gith daemon [start|stop|status]")
+    daemon_parser.add_argument("action", nargs="?", default="", help="start, stop or status")
+
     return parser
 
+def get_arg_parser():
+    global _arg_parser
+    if _arg_parser is None:
+        _arg_parser = init_arg_parser()
+
+    return _arg_parser
+
+def parse_number_options(args):
+    # CustomArgumentParser ignores argparse errors, so a bad number would silently fall back to the default.
+    # Numeric options are read as strings and converted here instead
+    for dest, number_type in NUMBER_OPTIONS.items():
+        value = getattr(args, dest, None)
+        if not isinstance(value, str):
+            continue
+
+        try:
+            setattr(args, dest, number_type(value))
+        except ValueError:
+            print(f"Error: '{value}' is not a valid number for --{dest}")
+            return False
+
+    return True
+
+def get_command_name(parser, command):
+    # Aliases share their command's parser, whose prog ends with the full command name
+    for action in parser._subparsers._group_actions:
+        if command in action.choices:
+            return action.choices[command].prog.split(" ")[-1]
+
+    return command
+
 def main():
-    parser = init_arg_parser()
+    start_time = time.perf_counter()
+    args = None
+    try:
+        args = run_gith_command()
+    finally:
+        if args is not None:
+            report_timings(args.command_name, " ".join(sys.argv[1:]), time.perf_counter() - start_time, args.timings, args.trace)
+        flush_gith_config()
+
+def run_gith_command():
+    parser = get_arg_parser()
     args, unknown_args = parser.parse_known_args()
+    args.command_name = get_command_name(parser, args.command)
+    if not parse_number_options(args):
+        sys.exit(1)
 
     if args.command == "status" or args.command == "s":
         print_status_command(args.all == "all")
     elif args.command == "sub-init" or args.command == "su":
         submodule_command()
     elif args.command == "clean" or args.command == "cl":
-        clean_non_git_files()
+        clean_non_git_files(args.jobs, args.mode, args.dry_run)
     elif args.command == "main-branch" or args.command == "mb":
         set_branch_name(args.branch)
     elif args.command == "remote" or args.command == "re":
@@ -964,6 +3729,20 @@ def main():
         fetch_branch_command(args.branch)
     elif args.command == "branch" or args.command == "b":
         branch_command(args.name)
+    elif args.command == "worktree" or args.command == "wt":
+        worktree_command(args.action, args.branch)
+    elif args.command == "timings" or args.command == "tm":
+        timings_command(get_command_name(parser, args.timed_command), args.count)
+    elif args.command == "bench":
+        # The exit code lets CI fail on a regression
+        if not bench_command(args.files, args.submodules, args.runs, args.output, args.baseline, args.keep):
+            sys.exit(1)
+    elif args.command == "tune":
+        tune_command(args.preset, args.apply == "apply")
+    elif args.command == "prefetch":
+        prefetch_command(args.action, args.interval)
+    elif args.command == "daemon":
+        daemon_command(args.action)
     elif args.command == "add-shortcut" or args.command == "asc":
         current = args.current == "current"
         add_shortcut_command(args.shortcut_name, args.shortcut_command, current)
@@ -978,21 +3757,36 @@ def main():
         switch_profile_command(args.profile_name)
     elif args.command == "delete-profile" or args.command == "dp":
         delete_profile()
+    elif args.command == "option" or args.command == "op":
+        profile_option_command(args.option_name, args.value)
+    elif args.command == "repo" or args.command == "rp":
+        repo_path = os.path.abspath(args.repo_path or get_repo_path())
+        set_repo_path(repo_path)
+        print(f"Repo for the '{get_current_profile()}' profile set to: {repo_path}")
+    elif args.command == "all":
+        all_command(args.all_command, args.all_args, args.jobs)
     elif args.command == "explorer" or args.command == "e":
         repo_path = get_repo_path()
         os.system(f"explorer {repo_path}")
     elif args.command == "build" or args.command == "bu":
-        generate_and_build_mc_platform(args.mc_platform)
+        generate_and_build_mc_platforms(args.mc_platforms, args.jobs)
     elif args.command == "vs-build" or args.command == "vsb":
         open_visual_studio_distributed_build(args.sln_path)
+    elif args.command == "purge-trash":
+        purge_trash_command(args.trash_root)
+    elif args.command == "ocr-bench":
+        benchmark_text_detectors(args.screenshot_dir)
     elif unknown_args:
-        unknown_command = unknown_args[0]
+        # Global options before a shortcut name end up in the unknown arguments too
+        unknown_command = next((arg for arg in unknown_args if not arg.startswith("-")), unknown_args[0])
         if not execute_shortcut_command(unknown_command, False):
             print(f"Error: the command '{unknown_command} is not a known command or shortcut, see list below\n")
             parser.print_help()
     else:
         parser.print_help()
 
+    return args
+
 if __name__ == "__main__":
     main()
 # ------- End Main Logic and Argument Parsing -------
\ No newline at end of file
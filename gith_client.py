@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import socket
+import signal
+
+# Must match GITH_STATE_DIR, DAEMON_SOCKET_FILE and DAEMON_EXIT_MARKER in gith.py
+GITH_STATE_DIR = os.path.expanduser("~/.gith")
+DAEMON_SOCKET_FILE = "daemon.sock"
+DAEMON_EXIT_MARKER = b"\0gith-exit:"
+
+# Enough bytes to never print part of the exit code trailer
+TRAILER_SIZE = len(DAEMON_EXIT_MARKER) + 12
+
+def run_with_daemon(argv):
+    # Returns the command's exit code, or None when the daemon can't run it
+    if not hasattr(socket, "AF_UNIX") or (argv and argv[0] == "daemon"):
+        return None
+
+    socket_path = os.path.join(GITH_STATE_DIR, DAEMON_SOCKET_FILE)
+    if not os.path.exists(socket_path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        request = {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        client.sendall((json.dumps(request) + "\n").encode())
+    except OSError:
+        client.close()
+        return None
+
+    output = sys.stdout.buffer
+    received = False
+    pending = b""
+    command_pid = None
+
+    # The command runs in its own process group in the daemon, pass Ctrl+C on to it
+    def forward_interrupt(signal_number, frame):
+        try:
+            if command_pid:
+                os.killpg(command_pid, signal.SIGINT)
+        except ProcessLookupError:
+            pass
+
+    previous_handler = signal.signal(signal.SIGINT, forward_interrupt)
+
+    try:
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+
+            received = True
+            pending += chunk
+
+            # The first line is the pid of the process running the command
+            if command_pid is None:
+                if b"\n" not in pending:
+                    continue
+                header, pending = pending.split(b"\n", 1)
+                command_pid = int(header)
+
+            if len(pending) > TRAILER_SIZE:
+                output.write(pending[:-TRAILER_SIZE])
+                output.flush()
+                pending = pending[-TRAILER_SIZE:]
+    finally:
+        client.close()
+        signal.signal(signal.SIGINT, previous_handler)
+
+    # The daemon closes without answering when it is shutting down
+    if not received:
+        return None
+
+    marker_index = pending.rfind(DAEMON_EXIT_MARKER)
+    if marker_index == -1:
+        output.write(pending)
+        output.flush()
+        return 1
+
+    output.write(pending[:marker_index])
+    output.flush()
+
+    try:
+        return int(pending[marker_index + len(DAEMON_EXIT_MARKER):])
+    except ValueError:
+        return 1
+
+def main():
+    try:
+        exit_code = run_with_daemon(sys.argv[1:])
+    except BrokenPipeError:
+        # Output was piped into a command that stopped reading, such as head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+
+    if exit_code is not None:
+        sys.exit(exit_code)
+
+    # No daemon, run the command in this process
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import gith
+    gith.main()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GITH_SCRIPT = os.path.join(REPO_ROOT, "gith.py")
+sys.path.insert(0, REPO_ROOT)
+
+import gith
+
+
+@pytest.fixture
+def gith_env(tmp_path):
+    # Same isolated HOME and git identity that `gith bench` uses
+    return gith.get_bench_env(str(tmp_path))
+
+
+def run_git(args, cwd, env):
+    result = subprocess.run(["git"] + args, cwd=cwd, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def run_gith(args, cwd, env):
+    return subprocess.run([sys.executable, GITH_SCRIPT] + args, cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+def commit_file(repo_dir, env, name, content):
+    with open(os.path.join(repo_dir, name), "a") as f:
+        f.write(content)
+    run_git(["add", name], repo_dir, env)
+    run_git(["commit", "-q", "-m", f"Change {name}"], repo_dir, env)
+    return run_git(["rev-parse", "HEAD"], repo_dir, env)
+
+
+@pytest.fixture
+def remote_repo(tmp_path, gith_env):
+    # Returns (upstream, workspace): a repo that pushes to a local bare remote, and a clone of that remote
+    upstream = str(tmp_path / "upstream")
+    remote = str(tmp_path / "remote.git")
+    workspace = str(tmp_path / "workspace")
+
+    run_git(["init", "-q", "-b", "main", upstream], str(tmp_path), gith_env)
+    commit_file(upstream, gith_env, "file.txt", "first\n")
+    run_git(["clone", "-q", "--bare", upstream, remote], str(tmp_path), gith_env)
+    run_git(["remote", "add", "origin", remote], upstream, gith_env)
+    run_git(["fetch", "-q", "origin"], upstream, gith_env)
+    run_git(["clone", "-q", remote, workspace], str(tmp_path), gith_env)
+
+    return upstream, workspace
+
+
+@pytest.fixture
+def gith_state(tmp_path, monkeypatch):
+    # Points gith's config and state files at a temporary home when it is called in process
+    home = tmp_path / "home"
+    home.mkdir(exist_ok=True)
+    monkeypatch.setattr(gith, "GITH_CONFIG_FILE", str(home / ".githconfig"))
+    monkeypatch.setattr(gith, "GITH_STATE_DIR", str(home / ".gith"))
+    monkeypatch.setitem(gith._config_store, "config", None)
+    monkeypatch.delenv("GITH_PROFILE", raising=False)
+    return home
+
+
+class FakeFrame:
+    # Stands in for a PIL screenshot: a flat shade plus the text that is visible and where
+    def __init__(self, width, height, shade, texts=None):
+        self.width = width
+        self.height = height
+        self.shade = shade
+        self.texts = texts or {}
+
+    def convert(self, mode):
+        return self
+
+    def resize(self, size):
+        return FakeFrame(size[0], size[1], self.shade, self.texts)
+
+    def tobytes(self):
+        return bytes([self.shade]) * (self.width * self.height)
+
+    def crop(self, box):
+        left, top, right, bottom = box
+        texts = {text: (x - left, y - top, width, height) for text, (x, y, width, height) in self.texts.items()
+                 if x >= left and y >= top and x + width <= right and y + height <= bottom}
+        return FakeFrame(right - left, bottom - top, self.shade, texts)
+
+    def save(self, path):
+        open(path, "wb").close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeDetector(gith.TextDetector):
+    name = "fake"
+
+    def __init__(self):
+        self.searched_sizes = []
+
+    def find(self, image, target_text):
+        self.searched_sizes.append((image.width, image.height))
+        return image.texts.get(target_text)
@@ -0,0 +1,57 @@
+import asyncio
+import collections
+
+import gith
+
+# Stands in for gith.py, a slow command that reports progress before it finishes
+STUB_GITH = """import time
+print("Fetching main")
+time.sleep(2)
+print("Done")
+"""
+
+
+def test_progress_is_read_while_the_command_runs(tmp_path, gith_state, monkeypatch):
+    stub_path = tmp_path / "gith.py"
+    stub_path.write_text(STUB_GITH)
+    monkeypatch.setattr(gith, "__file__", str(stub_path))
+    monkeypatch.delenv("PYTHONUNBUFFERED", raising=False)
+
+    progress = {"work": {"status": "queued", "start_time": None, "end_time": None, "last_line": "", "output": collections.deque(maxlen=20), "log_path": ""}}
+
+    async def run():
+        task = asyncio.create_task(gith.run_profile_command("work", str(tmp_path), ["fetch"], asyncio.Semaphore(1), progress, str(tmp_path)))
+        for _ in range(150):
+            if progress["work"]["last_line"]:
+                break
+            await asyncio.sleep(0.01)
+
+        # The first line shows up while the command is still sleeping, not only once it exits
+        seen_while_running = (progress["work"]["last_line"], task.done())
+        await task
+        return seen_while_running
+
+    assert asyncio.run(run()) == ("Fetching main", False)
+    assert progress["work"]["status"] == "done"
+    assert progress["work"]["last_line"] == "Done"
+
+
+# An error early on, followed by more lines than the progress table keeps
+STUB_GITH_EARLY_ERROR = """print("Error: Unable to fetch main")
+for i in range(50):
+    print(f"Cleaned submodule: sub{i}")
+print("Done", end="")
+"""
+
+
+def test_early_error_fails_the_profile(tmp_path, gith_state, monkeypatch):
+    stub_path = tmp_path / "gith.py"
+    stub_path.write_text(STUB_GITH_EARLY_ERROR)
+    monkeypatch.setattr(gith, "__file__", str(stub_path))
+
+    progress = {"work": {"status": "queued", "start_time": None, "end_time": None, "last_line": "", "output": collections.deque(maxlen=20), "log_path": ""}}
+    asyncio.run(gith.run_profile_command("work", str(tmp_path), ["fetch"], asyncio.Semaphore(1), progress, str(tmp_path)))
+
+    assert "Error: Unable to fetch main" not in progress["work"]["output"]
+    assert progress["work"]["status"] == "failed"
+    assert progress["work"]["last_line"] == "Done"
@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+
+import pytest
+
+import gith
+from conftest import run_git, run_gith
+
+
+@pytest.mark.parametrize("file_count", [10, 1000, 10000])
+def test_stage_files_without_submodules(tmp_path, gith_env, monkeypatch, file_count):
+    repo_dir = str(tmp_path / "repo")
+    run_git(["init", "-q", repo_dir], str(tmp_path), gith_env)
+    gith.write_bench_files(repo_dir, "src", file_count, size=16)
+    monkeypatch.chdir(repo_dir)
+
+    status_entries = gith.get_status_entries()
+    git_calls = []
+    real_run = subprocess.run
+
+    def counting_run(command, *args, **kwargs):
+        git_calls.append(command)
+        return real_run(command, *args, **kwargs)
+
+    monkeypatch.setattr(gith.subprocess, "run", counting_run)
+
+    assert gith.add_without_submodules(status_entries)
+
+    # One git process no matter how many files, with the paths passed on stdin. A process per file takes minutes at 10k files
+    assert len(git_calls) == 1
+    assert git_calls[0][0] == "git"
+    assert "add" in git_calls[0]
+    assert "--pathspec-from-file=-" in git_calls[0]
+    staged = run_git(["diff", "--cached", "--name-only"], repo_dir, gith_env).splitlines()
+    assert len(staged) == file_count
+
+
+def test_bench_command_report(tmp_path, gith_env):
+    output_path = str(tmp_path / "bench.json")
+    result = run_gith(["bench", "--files", "20", "--submodules", "1", "--runs", "1", "--output", output_path], str(tmp_path), gith_env)
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    with open(output_path) as f:
+        report = json.load(f)
+
+    assert report["passed"]
+    assert set(report["results"]) == {"status", "commit", "fetch", "branch", "clean", "sub-init"}
+    for name, timing in report["results"].items():
+        assert timing["runs"] == 1
+        assert 0 < timing["min"] <= timing["median"] <= timing["max"], name
+
+
+@pytest.mark.parametrize("bench_args", [["--runs", "0"], ["--files", "1"], ["--submodules", "-1"], ["--files", "x"], ["--runs", "1.5"]])
+def test_bench_command_rejects_invalid_arguments(tmp_path, gith_env, bench_args):
+    result = run_gith(["bench"] + bench_args, str(tmp_path), gith_env)
+
+    assert result.returncode == 1
+    assert "Error:" in result.stdout
+    assert "Traceback" not in result.stderr
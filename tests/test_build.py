@@ -0,0 +1,92 @@
+import os
+import sys
+
+import pytest
+
+import gith
+from conftest import run_git, run_gith
+
+# Prints what a gen_proj script does, with a pause in each phase
+STUB_GEN_PROJ = """import sys
+import time
+
+with open("gen_proj_runs.txt", "a") as f:
+    f.write(" ".join(sys.argv) + "\\n")
+
+print("Generating project for " + sys.argv[0])
+print("Building project files")
+time.sleep(0.2)
+print("msbuild build/minecraftpe.sln /m /p:Configuration=Release")
+print("  Compiling main.cpp")
+time.sleep(0.2)
+if "--package" in sys.argv:
+    print("Packaging minecraftpe.apk")
+sys.exit(int(sys.argv[-1]) if sys.argv[-1].isdigit() else 0)
+"""
+
+
+def create_stub_repo(tmp_path, gith_env, monkeypatch):
+    repo_dir = str(tmp_path / "repo")
+    run_git(["init", "-q", repo_dir], str(tmp_path), gith_env)
+    os.makedirs(os.path.join(repo_dir, "gen_proj"))
+    for gen_proj_script, _ in gith.MC_PLATFORM_BUILDS.values():
+        with open(os.path.join(repo_dir, "gen_proj", gen_proj_script), "w") as f:
+            f.write(STUB_GEN_PROJ)
+
+    monkeypatch.chdir(repo_dir)
+    return repo_dir
+
+
+def test_build_phases(tmp_path, gith_env, gith_state, monkeypatch):
+    create_stub_repo(tmp_path, gith_env, monkeypatch)
+    log_dir = str(tmp_path / "logs")
+    os.makedirs(log_dir)
+
+    command = [sys.executable, os.path.join("gen_proj", "android_ogl_arm64-v8a_google.py"), "--package"]
+    status, phase_durations, duration, log_path = gith.run_mc_platform_build("android", command, log_dir)
+
+    assert status == "passed"
+    assert list(phase_durations) == ["generate", "compile", "package"]
+    # "Building project files" is still part of generating, compiling starts at the msbuild command
+    assert phase_durations["generate"] >= 0.2
+    assert phase_durations["compile"] >= 0.2
+    assert duration >= 0.4
+
+    with open(log_path) as f:
+        log = f.read()
+    assert "Building project files" in log and "Packaging minecraftpe.apk" in log
+
+
+def test_failed_build(tmp_path, gith_env, gith_state, monkeypatch):
+    create_stub_repo(tmp_path, gith_env, monkeypatch)
+    log_dir = str(tmp_path / "logs")
+    os.makedirs(log_dir)
+
+    command = [sys.executable, os.path.join("gen_proj", "win32_renderdragon_x64.py"), "1"]
+    status, phase_durations, _, _ = gith.run_mc_platform_build("win32", command, log_dir)
+
+    assert status == "failed"
+    assert "package" not in phase_durations
+
+
+def test_build_platforms_once(tmp_path, gith_env, gith_state, monkeypatch, capsys):
+    repo_dir = create_stub_repo(tmp_path, gith_env, monkeypatch)
+
+    gith.generate_and_build_mc_platforms(["win32", "Win32", "uwp"], jobs=2)
+
+    with open(os.path.join(repo_dir, "gen_proj_runs.txt")) as f:
+        runs = f.read().splitlines()
+    assert sorted(run.split()[0] for run in runs) == [os.path.join("gen_proj", "uwp_renderdragon_x64_win10.py"), os.path.join("gen_proj", "win32_renderdragon_x64.py")]
+
+    output = capsys.readouterr().out
+    assert "Building win32, uwp with 2 at a time" in output
+    assert "Error:" not in output
+
+
+@pytest.mark.parametrize("command_args", [["build", "-j", "x"], ["all", "--jobs", "2.5"], ["clean", "--jobs", "two"]])
+def test_invalid_jobs_is_reported(tmp_path, gith_env, command_args):
+    result = run_gith(command_args, str(tmp_path), gith_env)
+
+    # Before, the bad value was dropped and the command ran with the default number of jobs
+    assert result.returncode == 1
+    assert result.stdout == f"Error: '{command_args[-1]}' is not a valid number for --jobs\n"
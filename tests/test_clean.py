@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+import gith
+from conftest import run_git, run_gith
+
+
+def make_file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("build output\n")
+
+
+def test_fast_delete_does_not_follow_symlinks(tmp_path):
+    outside = tmp_path / "outside"
+    make_file(str(outside / "keep.txt"))
+    build = tmp_path / "repo" / "build"
+    make_file(str(build / "obj" / "a.o"))
+    os.symlink(str(outside), str(build / "link"))
+
+    file_count, failed_paths = gith.fast_delete_paths([str(build)])
+
+    assert not failed_paths
+    assert not build.exists()
+    assert (outside / "keep.txt").exists()
+
+
+def test_collect_tree_treats_junctions_as_leaves(tmp_path, monkeypatch):
+    # Junctions only exist on Windows, a plain folder stands in for the junction's target here
+    build = tmp_path / "build"
+    make_file(str(build / "obj" / "a.o"))
+    make_file(str(build / "junction" / "outside.txt"))
+    junction = str(build / "junction")
+    monkeypatch.setattr(gith, "is_junction", lambda path: path == junction)
+
+    file_paths, dir_paths = gith.collect_tree(str(build))
+
+    assert junction in dir_paths
+    assert str(build / "obj" / "a.o") in file_paths
+    assert not any(path.startswith(junction + os.sep) for path in file_paths + dir_paths)
+
+
+@pytest.fixture
+def built_repo(remote_repo, gith_env):
+    # A clone with build output from before the manifest, returns (workspace, build folder)
+    _, workspace = remote_repo
+    with open(os.path.join(workspace, ".gitignore"), "w") as f:
+        f.write("build/\n")
+    run_git(["add", ".gitignore"], workspace, gith_env)
+    run_git(["commit", "-q", "-m", "Ignore build"], workspace, gith_env)
+
+    build = os.path.join(workspace, "build")
+    make_file(os.path.join(build, "old.o"))
+    make_file(os.path.join(workspace, "notes.txt"))
+    return workspace, build
+
+
+def test_incremental_clean_removes_only_new_files(built_repo, gith_env):
+    workspace, build = built_repo
+    assert "Recorded 2 non-git files" in run_gith(["clean", "snapshot"], workspace, gith_env).stdout
+
+    make_file(os.path.join(build, "new", "new.o"))
+    with open(os.path.join(workspace, "notes.txt"), "a") as f:
+        f.write("changed after the snapshot\n")
+
+    result = run_gith(["clean", "incremental"], workspace, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+    assert "Removing 2 new or changed files" in result.stdout
+
+    assert not os.path.exists(os.path.join(build, "new"))
+    assert not os.path.exists(os.path.join(workspace, "notes.txt"))
+    assert os.path.exists(os.path.join(build, "old.o"))
+    assert os.path.exists(os.path.join(workspace, "file.txt"))
+    assert os.path.exists(os.path.join(workspace, ".gitignore"))
+
+
+def test_incremental_clean_dry_run(built_repo, gith_env):
+    workspace, build = built_repo
+    run_gith(["clean", "snapshot"], workspace, gith_env)
+    make_file(os.path.join(build, "new.o"))
+
+    result = run_gith(["clean", "incremental", "--dry-run"], workspace, gith_env)
+    assert "Would remove 1 new or changed files" in result.stdout
+    assert os.path.join("build", "new.o") in result.stdout
+    assert os.path.exists(os.path.join(build, "new.o"))
+    assert os.path.exists(os.path.join(build, "old.o"))
+
+
+def test_incremental_clean_without_manifest_cleans_everything(built_repo, gith_env):
+    workspace, build = built_repo
+
+    result = run_gith(["clean", "incremental"], workspace, gith_env)
+    assert "No manifest recorded for this repo yet, running a full clean" in result.stdout
+    assert not os.path.exists(build)
+    assert not os.path.exists(os.path.join(workspace, "notes.txt"))
+    assert os.path.exists(os.path.join(workspace, "file.txt"))
@@ -0,0 +1,31 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from conftest import run_gith
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="Windows only has a read-only flag")
+
+
+def get_config_mode(gith_env):
+    return stat.S_IMODE(os.stat(os.path.join(gith_env["HOME"], ".githconfig")).st_mode)
+
+
+def test_new_config_uses_umask(tmp_path, gith_env):
+    umask = os.umask(0o022)
+    try:
+        assert run_gith(["main-branch", "main"], str(tmp_path), gith_env).returncode == 0
+    finally:
+        os.umask(umask)
+
+    assert get_config_mode(gith_env) == 0o644
+
+
+def test_config_mode_is_kept(tmp_path, gith_env):
+    assert run_gith(["main-branch", "main"], str(tmp_path), gith_env).returncode == 0
+    os.chmod(os.path.join(gith_env["HOME"], ".githconfig"), 0o640)
+
+    assert run_gith(["main-branch", "develop"], str(tmp_path), gith_env).returncode == 0
+    assert get_config_mode(gith_env) == 0o640
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+import gith
+from conftest import GITH_SCRIPT
+
+
+def test_command_writes_config_once(tmp_path, gith_state, monkeypatch):
+    replaced_paths = []
+    real_replace = os.replace
+
+    def counting_replace(source, destination):
+        replaced_paths.append(destination)
+        real_replace(source, destination)
+
+    monkeypatch.setattr(gith.os, "replace", counting_replace)
+    monkeypatch.setattr(sys, "argv", ["gith.py", "main-branch", "develop"])
+    monkeypatch.chdir(tmp_path)
+
+    # Creating the default section and setting the branch are both saved by a single write at the end
+    gith.main()
+
+    assert replaced_paths == [gith.GITH_CONFIG_FILE]
+    assert gith.read_gith_config().get("default", "branch_name") == "develop"
+    assert not os.path.exists(gith.GITH_CONFIG_FILE + ".lock")
+
+
+def test_external_edit_invalidates_cached_config(gith_state):
+    with open(gith.GITH_CONFIG_FILE, "w") as f:
+        f.write("[default]\nbranch_name = main\n")
+    assert gith.read_gith_config().get("default", "branch_name") == "main"
+
+    with open(gith.GITH_CONFIG_FILE, "w") as f:
+        f.write("[default]\nbranch_name = develop\n")
+    # Bump the mtime in case both writes landed in the same clock tick
+    stat_result = os.stat(gith.GITH_CONFIG_FILE)
+    os.utime(gith.GITH_CONFIG_FILE, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000))
+
+    assert gith.read_gith_config().get("default", "branch_name") == "develop"
+
+
+def test_flush_keeps_changes_written_by_another_process(gith_state):
+    with open(gith.GITH_CONFIG_FILE, "w") as f:
+        f.write("[default]\nbranch_name = main\nremote_name = origin\n")
+
+    config = gith.read_gith_config()
+    config.set("default", "branch_name", "develop")
+    config.remove_option("default", "remote_name")
+    gith.write_gith_config(config)
+
+    # Another gith process saves its own change before this one flushes
+    with open(gith.GITH_CONFIG_FILE, "a") as f:
+        f.write("\n[work]\nrepo_path = /src/work\n")
+
+    gith.flush_gith_config()
+
+    with open(gith.GITH_CONFIG_FILE) as f:
+        saved = f.read()
+    assert "branch_name = develop" in saved
+    assert "remote_name" not in saved
+    assert "repo_path = /src/work" in saved
+
+
+def test_parallel_commands_keep_every_update(tmp_path, gith_env):
+    processes = []
+    for i in range(8):
+        env = dict(gith_env, GITH_PROFILE=f"profile{i}")
+        processes.append(subprocess.Popen([sys.executable, GITH_SCRIPT, "main-branch", f"branch{i}"], cwd=str(tmp_path), env=env, stdout=subprocess.PIPE, text=True))
+
+    for process in processes:
+        output, _ = process.communicate()
+        assert "Error:" not in output, output
+
+    with open(os.path.join(gith_env["HOME"], ".githconfig")) as f:
+        saved = f.read()
+    for i in range(8):
+        assert f"[profile{i}]\nbranch_name = branch{i}\n" in saved
@@ -0,0 +1,90 @@
+import os
+import socket
+import subprocess
+import sys
+
+import pytest
+
+import gith
+from conftest import REPO_ROOT, run_gith
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX") or not hasattr(os, "fork"), reason="the daemon needs Unix sockets")
+
+
+def run_client(args, cwd, env):
+    return subprocess.run([sys.executable, os.path.join(REPO_ROOT, "gith_client.py")] + args, cwd=cwd, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+@pytest.fixture
+def daemon(remote_repo, gith_env):
+    _, workspace = remote_repo
+    assert "Started gith daemon" in run_gith(["daemon", "start"], workspace, gith_env).stdout
+    yield workspace
+    run_gith(["daemon", "stop"], workspace, gith_env)
+
+
+def test_config_writes_are_seen_by_later_requests(daemon, gith_env):
+    # The daemon started without a ~/.githconfig, so it created the default one itself
+    assert run_client(["main-branch", "dev"], daemon, gith_env).returncode == 0
+    assert "Main Branch: dev" in run_client(["status"], daemon, gith_env).stdout
+
+    run_client(["add-shortcut", "hello", "echo hello from shortcut"], daemon, gith_env)
+    assert "hello from shortcut" in run_client(["shortcut", "hello"], daemon, gith_env).stdout
+
+
+def test_exit_code_is_forwarded(daemon, gith_env):
+    result = run_client(["bench", "--runs", "0"], daemon, gith_env)
+    assert result.returncode == 1
+
+
+def run_client_from_other_home(args, cwd, env, daemon_env):
+    # A client whose HOME differs from the daemon's, connected to the daemon's socket; exit code 99 means it wasn't served
+    client_code = ("import sys, gith_client\n"
+                   f"gith_client.GITH_STATE_DIR = {os.path.join(daemon_env['HOME'], '.gith')!r}\n"
+                   "exit_code = gith_client.run_with_daemon(sys.argv[1:])\n"
+                   "sys.exit(99 if exit_code is None else exit_code)\n")
+    return subprocess.run([sys.executable, "-c", client_code] + args, cwd=cwd, env=dict(env, PYTHONPATH=REPO_ROOT), stdin=subprocess.DEVNULL, capture_output=True, text=True)
+
+
+def test_requests_use_their_own_home(daemon, gith_env, tmp_path):
+    assert run_client(["main-branch", "daemon-home"], daemon, gith_env).returncode == 0
+
+    other_home = tmp_path / "other-home"
+    other_home.mkdir()
+    other_env = dict(gith_env, HOME=str(other_home), USERPROFILE=str(other_home))
+
+    result = run_client_from_other_home(["status"], daemon, other_env, gith_env)
+    assert result.returncode == 0, result.stderr
+    assert "Main Branch: daemon-home" not in result.stdout
+
+    assert run_client_from_other_home(["main-branch", "other-home"], daemon, other_env, gith_env).returncode == 0
+    assert "other-home" in (other_home / ".githconfig").read_text()
+    assert "other-home" not in (tmp_path / "home" / ".githconfig").read_text()
+    assert "Main Branch: daemon-home" in run_client(["status"], daemon, gith_env).stdout
+
+
+def test_shortcuts_are_compiled_by_the_daemon(remote_repo, gith_env):
+    _, workspace = remote_repo
+    run_gith(["add-shortcut", "where", '[["echo", "on ^#branch"], {"parallel": ["echo ^#profile"]}]'], workspace, gith_env)
+    assert "Started gith daemon" in run_gith(["daemon", "start"], workspace, gith_env).stdout
+
+    try:
+        result = run_client(["shortcut", "where"], workspace, gith_env)
+        assert "on main" in result.stdout
+        assert "default" in result.stdout
+    finally:
+        run_gith(["daemon", "stop"], workspace, gith_env)
+
+
+def test_warm_state_covers_shortcuts_and_repos(remote_repo, gith_state, monkeypatch):
+    _, workspace = remote_repo
+    monkeypatch.setattr(gith, "_git_dirs_cache", {})
+    config = gith.read_gith_config()
+    config.set("default", "repo_path", workspace)
+    config.set("default", gith.SHORTCUT_PREFIX + "where", '[["echo", "on ^#branch"], {"parallel": ["echo ^#profile"]}]')
+    gith.write_gith_config(config)
+
+    gith.warm_daemon_state()
+
+    assert {"on ^#branch", "echo ^#profile"} <= set(gith._config_store["templates"])
+    assert gith._git_dirs_cache[workspace][0] == os.path.join(workspace, ".git")
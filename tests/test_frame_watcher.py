@@ -0,0 +1,54 @@
+import gith
+from conftest import FakeClock, FakeDetector, FakeFrame
+
+
+def recorded_frames(frames):
+    # Replays the frames in order and keeps returning the last one
+    remaining = list(frames)
+
+    def screenshot(region=None):
+        return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+    return screenshot
+
+
+def test_wait_for_text_only_searches_changed_frames(gith_state, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gith, "time", clock)
+
+    loading = FakeFrame(800, 600, 16)
+    loaded = FakeFrame(800, 600, 160, {"Build": (100, 10, 40, 12)})
+    detector = FakeDetector()
+    watcher = gith.FrameWatcher(recorded_frames([loading, loading, loading, loaded]), (0, 0, 800, 600), [detector])
+
+    assert watcher.wait_for_text("Build", timeout=10)
+
+    # The repeated loading frames are skipped, and polling backs off while they repeat
+    assert detector.searched_sizes == [(800, 600), (800, 600)]
+    assert clock.sleeps == [0.2, 0.4, 0.8]
+
+
+def test_wait_for_text_searches_learned_region_first(gith_state, monkeypatch):
+    monkeypatch.setattr(gith, "time", FakeClock())
+
+    loaded = FakeFrame(800, 600, 160, {"Build": (100, 10, 40, 12)})
+    detector = FakeDetector()
+    assert gith.FrameWatcher(recorded_frames([loaded]), (0, 0, 800, 600), [detector]).wait_for_text("Build", timeout=10)
+
+    # The band is stored in the state dir, so a new watcher uses it too
+    detector = FakeDetector()
+    assert gith.FrameWatcher(recorded_frames([loaded]), (0, 0, 800, 600), [detector]).wait_for_text("Build", timeout=10)
+    assert detector.searched_sizes == [(800, 60)]
+
+
+def test_wait_for_text_times_out_on_idle_screen(gith_state, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gith, "time", clock)
+
+    detector = FakeDetector()
+    watcher = gith.FrameWatcher(recorded_frames([FakeFrame(800, 600, 16)]), (0, 0, 800, 600), [detector])
+
+    assert not watcher.wait_for_text("Build", timeout=3)
+    assert len(detector.searched_sizes) == 1
+    assert clock.now <= 3
+    assert max(clock.sleeps) == watcher.max_interval
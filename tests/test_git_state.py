@@ -0,0 +1,41 @@
+import os
+
+import gith
+
+from conftest import commit_file, run_git, run_gith
+
+
+def test_ref_that_is_a_folder_falls_back_to_packed_refs(remote_repo, gith_env):
+    _, workspace = remote_repo
+    run_git(["branch", "release/1.0"], workspace, gith_env)
+
+    assert gith.resolve_git_ref("refs/heads/release", workspace) is None
+    assert gith.resolve_git_ref("refs/heads/release/1.0", workspace) == run_git(["rev-parse", "HEAD"], workspace, gith_env)
+
+    run_gith(["main-branch", "release"], workspace, gith_env)
+    result = run_gith(["status", "all"], workspace, gith_env)
+    assert "Traceback" not in result.stderr, result.stderr
+
+
+def test_packed_refs_are_read(remote_repo, gith_env):
+    _, workspace = remote_repo
+    run_git(["pack-refs", "--all"], workspace, gith_env)
+
+    assert gith.resolve_git_ref("refs/remotes/origin/main", workspace) == run_git(["rev-parse", "origin/main"], workspace, gith_env)
+
+
+def test_ref_rewritten_within_one_mtime_tick(remote_repo, gith_env):
+    _, workspace = remote_repo
+    first_sha = run_git(["rev-parse", "HEAD"], workspace, gith_env)
+    run_git(["branch", "topic"], workspace, gith_env)
+    assert gith.resolve_git_ref("refs/heads/topic", workspace) == first_sha
+
+    # Same size and same mtime, like two updates on a file system with a coarse timestamp
+    second_sha = commit_file(workspace, gith_env, "file.txt", "second\n")
+    ref_path = os.path.join(workspace, ".git", "refs", "heads", "topic")
+    ref_stat = os.stat(ref_path)
+    with open(ref_path, "w") as f:
+        f.write(second_sha + "\n")
+    os.utime(ref_path, ns=(ref_stat.st_atime_ns, ref_stat.st_mtime_ns))
+
+    assert gith.resolve_git_ref("refs/heads/topic", workspace) == second_sha
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from conftest import GITH_SCRIPT, run_git
+
+# Loose enough for a slow CI machine, a single heavy import such as pyautogui or asyncio still goes over it
+IMPORT_BUDGET_MS = 150
+
+# Only needed by vs-build, build and `gith all`
+LAZY_MODULES = {"pyautogui", "pytesseract", "PIL", "asyncio"}
+
+
+def get_imports(repo_dir, env):
+    # Returns {module: cumulative microseconds} for the modules `gith status` imports
+    result = subprocess.run([sys.executable, "-X", "importtime", GITH_SCRIPT, "status"], cwd=repo_dir, env=env, stdin=subprocess.DEVNULL, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, module = line[len("import time:"):].split("|")
+        imports[module.rstrip()] = int(cumulative)
+
+    return imports
+
+
+def test_status_import_time(tmp_path, gith_env):
+    repo_dir = str(tmp_path / "repo")
+    run_git(["init", "-q", repo_dir], str(tmp_path), gith_env)
+
+    imports = get_imports(repo_dir, gith_env)
+    imported = {module.strip().split(".")[0] for module in imports}
+    assert not imported & LAZY_MODULES
+
+    # Top level imports aren't indented, their cumulative time already includes everything they import
+    total_ms = sum(cumulative for module, cumulative in imports.items() if not module.startswith("  ")) / 1000
+    assert total_ms < IMPORT_BUDGET_MS, f"gith imports took {total_ms:.0f}ms"
@@ -0,0 +1,33 @@
+import os
+
+import gith
+from conftest import run_git, run_gith
+
+
+def test_compile_template():
+    assert gith.compile_template("git push ^#remote ^#branch:^#main_branch") == [
+        (False, "git push "), (True, "remote"), (False, " "), (True, "branch"), (False, ":"), (True, "main_branch")]
+    # Unknown macros stay literal text, and a known one is matched in full rather than by a shorter prefix
+    assert gith.compile_template("echo ^#unknown ^#branchy") == [(False, "echo ^#unknown "), (True, "branch"), (False, "y")]
+    assert gith.compile_template("no macros") == [(False, "no macros")]
+
+
+def test_replace_variables(remote_repo, gith_env, gith_state, monkeypatch):
+    _, workspace = remote_repo
+    monkeypatch.chdir(workspace)
+    monkeypatch.setattr(gith, "_template_values", {})
+
+    head_sha = run_git(["rev-parse", "HEAD"], workspace, gith_env)
+    assert gith.replace_variables("^#remote/^#branch ^#head_sha ^#profile") == f"origin/main {head_sha} default"
+    assert gith.replace_variables("^#repo_path") == os.getcwd()
+    assert gith.replace_variables("echo ^#nothing") == "echo ^#nothing"
+
+
+def test_macros_follow_earlier_steps(remote_repo, gith_env):
+    _, workspace = remote_repo
+    shortcut = '[["git", "checkout", "-q", "-b", "topic"], ["echo", "on ^#branch"], ["git", "commit", "-q", "--allow-empty", "-m", "step"], ["echo", "at ^#head_sha"]]'
+    run_gith(["add-shortcut", "topic", shortcut], workspace, gith_env)
+
+    result = run_gith(["shortcut", "topic"], workspace, gith_env)
+    assert "on topic" in result.stdout
+    assert f"at {run_git(['rev-parse', 'HEAD'], workspace, gith_env)}" in result.stdout
@@ -0,0 +1,57 @@
+from conftest import commit_file, run_git, run_gith
+
+
+def test_fetch_gets_commits_pushed_after_prefetch(remote_repo, gith_env):
+    upstream, workspace = remote_repo
+
+    prefetched_sha = commit_file(upstream, gith_env, "file.txt", "prefetched\n")
+    run_git(["push", "-q", "origin", "main"], upstream, gith_env)
+    assert run_gith(["prefetch", "run"], workspace, gith_env).returncode == 0
+    assert run_git(["rev-parse", "refs/prefetch/remotes/origin/main"], workspace, gith_env) == prefetched_sha
+
+    latest_sha = commit_file(upstream, gith_env, "file.txt", "latest\n")
+    run_git(["push", "-q", "origin", "main"], upstream, gith_env)
+
+    result = run_gith(["fetch"], workspace, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+    assert run_git(["rev-parse", "HEAD"], workspace, gith_env) == latest_sha
+
+
+def test_prefetch_skips_busy_repo(remote_repo, gith_env):
+    _, workspace = remote_repo
+    open(f"{workspace}/.git/index.lock", "w").close()
+
+    result = run_gith(["prefetch", "run"], workspace, gith_env)
+    assert "git is busy" in result.stdout
+
+
+def test_fetch_only_downloads_main(remote_repo, gith_env):
+    upstream, workspace = remote_repo
+
+    run_git(["push", "-q", "origin", "main:other"], upstream, gith_env)
+    assert run_gith(["fetch"], workspace, gith_env).returncode == 0
+    assert run_git(["for-each-ref", "refs/remotes/origin/other"], workspace, gith_env) == ""
+
+
+def test_fetch_prune_removes_deleted_branches(remote_repo, gith_env):
+    upstream, workspace = remote_repo
+
+    run_git(["push", "-q", "origin", "main:deleted", "main:kept"], upstream, gith_env)
+    run_git(["fetch", "-q", "origin"], workspace, gith_env)
+    run_git(["push", "-q", "origin", ":deleted"], upstream, gith_env)
+
+    assert run_gith(["fetch"], workspace, gith_env).returncode == 0
+    assert run_git(["for-each-ref", "refs/remotes/origin/deleted"], workspace, gith_env) == ""
+    assert run_git(["for-each-ref", "--format=%(refname)", "refs/remotes/origin/kept"], workspace, gith_env) == "refs/remotes/origin/kept"
+
+
+def test_fetch_prune_can_be_turned_off(remote_repo, gith_env):
+    upstream, workspace = remote_repo
+
+    run_git(["push", "-q", "origin", "main:deleted"], upstream, gith_env)
+    run_git(["fetch", "-q", "origin"], workspace, gith_env)
+    run_git(["push", "-q", "origin", ":deleted"], upstream, gith_env)
+
+    assert run_gith(["option", "fetch_prune", "false"], workspace, gith_env).returncode == 0
+    assert run_gith(["fetch"], workspace, gith_env).returncode == 0
+    assert run_git(["for-each-ref", "--format=%(refname)", "refs/remotes/origin/deleted"], workspace, gith_env) == "refs/remotes/origin/deleted"
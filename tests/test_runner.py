@@ -0,0 +1,37 @@
+import sys
+
+import gith
+
+
+def test_streaming_command_inactivity_timeout(tmp_path):
+    command = [sys.executable, "-c", "import time\nprint('started', flush=True)\ntime.sleep(30)"]
+    result = gith.run_streaming_command(command, inactivity_timeout=1, echo=False, cwd=str(tmp_path))
+
+    assert result.timed_out
+    assert result.output_tail == ["started"]
+    assert result.duration < 10
+
+
+def test_streaming_command_keeps_active_commands(tmp_path):
+    # Runs longer than the inactivity timeout, but never goes quiet for that long
+    command = [sys.executable, "-c", "import time\nfor _ in range(6):\n    print('working', flush=True)\n    time.sleep(0.2)"]
+    result = gith.run_streaming_command(command, inactivity_timeout=0.6, echo=False, cwd=str(tmp_path))
+
+    assert not result.timed_out
+    assert result.returncode == 0
+    assert result.output_tail == ["working"] * 6
+
+
+def test_captured_command_timeout(tmp_path, capsys):
+    result = gith.run_captured_command([sys.executable, "-c", "import time\ntime.sleep(30)"], cwd=str(tmp_path), timeout=0.5)
+
+    assert result.returncode == -1
+    assert result.stdout == ""
+    assert "Error:" in capsys.readouterr().out
+
+
+def test_captured_command_output(tmp_path):
+    result = gith.run_captured_command([sys.executable, "-c", "import sys\nsys.stdout.buffer.write(sys.stdin.buffer.read())"], input=b"a\0b", cwd=str(tmp_path), text=False)
+
+    assert result.returncode == 0
+    assert result.stdout == b"a\0b"
@@ -0,0 +1,76 @@
+import json
+import os
+import signal
+import sys
+import time
+
+import pytest
+
+import gith
+from conftest import run_gith
+
+
+def test_plain_strings_starting_with_a_bracket_stay_plain():
+    assert gith.parse_shortcut_stages("[ -f x ] && make") == [["[ -f x ] && make"]]
+
+
+def test_structured_shortcut_stages():
+    stages = gith.parse_shortcut_stages('[["gith", "fetch"], {"parallel": [["a"], "b c"]}]')
+    assert stages == [[["gith", "fetch"]], [["a"], "b c"]]
+
+
+def test_empty_structured_shortcuts_are_rejected():
+    assert gith.parse_shortcut_stages("[]") is None
+    assert gith.parse_shortcut_stages('[{"parallel": []}]') is None
+    assert gith.parse_shortcut_stages('[["ok"], []]') is None
+
+
+def test_empty_shortcut_is_not_saved(tmp_path, gith_env):
+    run_gith(["add-shortcut", "empty", "[]"], str(tmp_path), gith_env)
+    result = run_gith(["shortcut", "empty"], str(tmp_path), gith_env)
+    assert "Traceback" not in result.stderr
+    assert "No shortcut found" in result.stdout
+
+
+def test_parallel_failure_stops_siblings(tmp_path, gith_env):
+    shortcut = '[{"parallel": [["sleep", "10"], ["false"]]}, ["echo", "never"]]'
+    run_gith(["add-shortcut", "fail", shortcut], str(tmp_path), gith_env)
+    result = run_gith(["shortcut", "fail"], str(tmp_path), gith_env)
+    assert "failed with exit code 1" in result.stdout
+    assert "Stopping 'sleep 10'" in result.stdout
+    assert "Skipping the remaining 1 shortcut steps" in result.stdout
+
+
+def test_blank_shortcut_is_not_saved(tmp_path, gith_env):
+    result = run_gith(["add-shortcut", "blank", "   "], str(tmp_path), gith_env)
+    assert "Error: The shortcut command was not specified" in result.stdout
+    assert "No shortcut found" in run_gith(["shortcut", "blank"], str(tmp_path), gith_env).stdout
+
+
+def test_shortcut_that_resolves_to_nothing(tmp_path, gith_env):
+    # No build folder, so ^#sln_path is empty
+    run_gith(["add-shortcut", "sln", "^#sln_path"], str(tmp_path), gith_env)
+    result = run_gith(["shortcut", "sln"], str(tmp_path), gith_env)
+    assert "Traceback" not in result.stderr, result.stderr
+    assert "Error: Unable to run '^#sln_path': the command is empty" in result.stdout
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="uses sh")
+def test_parallel_failure_stops_grandchildren(tmp_path, gith_env):
+    pid_file = tmp_path / "sleep.pid"
+    shortcut = json.dumps([{"parallel": [f"sleep 30 > /dev/null 2>&1 & echo $! > {pid_file}; wait", ["sh", "-c", "sleep 0.5; exit 3"]]}])
+    run_gith(["add-shortcut", "fail", shortcut], str(tmp_path), gith_env)
+
+    result = run_gith(["shortcut", "fail"], str(tmp_path), gith_env)
+    assert "failed with exit code 3" in result.stdout
+
+    sleep_pid = int(pid_file.read_text())
+    for _ in range(50):
+        try:
+            os.kill(sleep_pid, 0)
+        except ProcessLookupError:
+            break
+        time.sleep(0.1)
+    else:
+        os.kill(sleep_pid, signal.SIGKILL)
+        pytest.fail("the shell's sleep kept running after its step was stopped")
@@ -0,0 +1,38 @@
+import os
+
+import gith
+
+
+def write_sln(path, mtime):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write("Microsoft Visual Studio Solution File\n")
+    os.utime(path, (mtime, mtime))
+
+
+def test_newest_solution_in_an_existing_folder_is_found(tmp_path, gith_state):
+    build = tmp_path / "build"
+    write_sln(str(build / "a" / "x.sln"), 1000)
+    os.makedirs(build / "b")
+
+    assert gith.find_sln_file(str(build)) == str(build / "a" / "x.sln")
+
+    write_sln(str(build / "b" / "y.sln"), 2000)
+    assert gith.find_sln_file(str(build)) == str(build / "b" / "y.sln")
+
+
+def test_regenerated_solution_is_picked_again(tmp_path, gith_state):
+    build = tmp_path / "build"
+    write_sln(str(build / "a" / "x.sln"), 1000)
+    write_sln(str(build / "b" / "y.sln"), 2000)
+    assert gith.find_sln_file(str(build)) == str(build / "b" / "y.sln")
+
+    os.utime(build / "a" / "x.sln", (3000, 3000))
+    assert gith.find_sln_file(str(build)) == str(build / "a" / "x.sln")
+
+
+def test_solutions_in_platform_folders_are_found(tmp_path, gith_state):
+    build = tmp_path / "build"
+    write_sln(str(build / "x64" / "Release" / "game.sln"), 1000)
+
+    assert gith.find_sln_file(str(build)) == str(build / "x64" / "Release" / "game.sln")
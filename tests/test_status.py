@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+import gith
+from conftest import run_git
+
+SHA = "0" * 40
+MODES = "100644 100644 100644"
+Entry = gith.StatusEntry
+
+
+@pytest.mark.parametrize("records, entries", [
+    # Ordinary changes, staged and unstaged
+    ([f"1 .M N... {MODES} {SHA} {SHA} src/main.cpp"], [Entry("src/main.cpp", ".M")]),
+    ([f"1 A. N... 000000 100644 100644 {SHA} {SHA} new.txt"], [Entry("new.txt", "A.")]),
+    # Renames and copies take two records, the new path and then the original one
+    ([f"2 R. N... {MODES} {SHA} {SHA} R100 c d.txt", "a b.txt"], [Entry("c d.txt", "R.", False, "a b.txt")]),
+    ([f"2 C. N... {MODES} {SHA} {SHA} C75 copy.txt", "orig.txt", f"1 .M N... {MODES} {SHA} {SHA} after.txt"],
+     [Entry("copy.txt", "C.", False, "orig.txt"), Entry("after.txt", ".M")]),
+    # Unmerged entries have three stages
+    ([f"u UU N... 100644 100644 100644 100644 {SHA} {SHA} {SHA} conflict.txt"], [Entry("conflict.txt", "UU")]),
+    (["? untracked file.txt", "! build/"], [Entry("untracked file.txt", "??"), Entry("build/", "!!")]),
+    # Submodules have S in the third field, with C, M and U flags for commit, tracked and untracked changes
+    ([f"1 .M SC.. 160000 160000 160000 {SHA} {SHA} external/lib"], [Entry("external/lib", ".M", True)]),
+    ([f"1 .M S.MU 160000 160000 160000 {SHA} {SHA} external/other"], [Entry("external/other", ".M", True)]),
+    # -z output doesn't quote paths, so spaces and newlines are part of them
+    ([f"1 .M N... {MODES} {SHA} {SHA} dir with spaces/a  b.txt"], [Entry("dir with spaces/a  b.txt", ".M")]),
+    (["? new\nline.txt", f"2 R. N... {MODES} {SHA} {SHA} R100 to\nnew", "from\nold"],
+     [Entry("new\nline.txt", "??"), Entry("to\nnew", "R.", False, "from\nold")]),
+    # Headers from --branch are skipped
+    (["# branch.oid " + SHA, "# branch.head main", "? a.txt"], [Entry("a.txt", "??")]),
+    ([], []),
+])
+def test_parse_status_output(records, entries):
+    output = "".join(record + "\0" for record in records)
+    assert gith.parse_status_output(output) == entries
+
+
+def test_status_entries_of_a_real_repo(tmp_path, gith_env, monkeypatch):
+    repo_dir = str(tmp_path / "repo")
+    run_git(["init", "-q", repo_dir], str(tmp_path), gith_env)
+    for name in ("a b.txt", "tracked.txt"):
+        with open(os.path.join(repo_dir, name), "w") as f:
+            f.write(name)
+    run_git(["add", "."], repo_dir, gith_env)
+    run_git(["commit", "-q", "-m", "Initial commit"], repo_dir, gith_env)
+
+    run_git(["mv", "a b.txt", "c d.txt"], repo_dir, gith_env)
+    with open(os.path.join(repo_dir, "tracked.txt"), "a") as f:
+        f.write("changed")
+    with open(os.path.join(repo_dir, "new\nline.txt"), "w") as f:
+        f.write("new")
+
+    monkeypatch.chdir(repo_dir)
+    assert sorted(gith.get_status_entries(), key=lambda entry: entry.path) == [
+        Entry("c d.txt", "R.", False, "a b.txt"),
+        Entry("new\nline.txt", "??"),
+        Entry("tracked.txt", ".M"),
+    ]
@@ -0,0 +1,40 @@
+import sys
+
+import gith
+from conftest import commit_file, run_git
+
+
+def test_cache_keeps_every_commit_it_was_given(tmp_path, gith_env, monkeypatch):
+    for key, value in gith_env.items():
+        monkeypatch.setenv(key, value)
+    monkeypatch.chdir(tmp_path)
+
+    submodule = str(tmp_path / "submodule")
+    cache = str(tmp_path / "cache" / "submodule.git")
+    run_git(["init", "-q", "-b", "main", submodule], str(tmp_path), gith_env)
+    first_sha = commit_file(submodule, gith_env, "file.txt", "first\n")
+
+    assert gith.update_submodule_cache(cache, submodule)
+    assert run_git(["config", "gc.pruneExpire"], cache, gith_env) == "never"
+
+    # A commit that later disappears from every branch of the submodule
+    dropped_sha = commit_file(submodule, gith_env, "file.txt", "dropped\n")
+    assert gith.update_submodule_cache(cache, submodule)
+
+    run_git(["reset", "-q", "--hard", first_sha], submodule, gith_env)
+    latest_sha = commit_file(submodule, gith_env, "file.txt", "latest\n")
+    assert gith.update_submodule_cache(cache, submodule)
+
+    run_git(["gc", "-q"], cache, gith_env)
+    assert run_git(["rev-parse", "refs/heads/main"], cache, gith_env) == latest_sha
+    assert run_git(["rev-parse", f"refs/gith/commits/{dropped_sha}"], cache, gith_env) == dropped_sha
+    run_git(["cat-file", "-e", dropped_sha], cache, gith_env)
+
+
+def test_streaming_command_total_timeout(tmp_path):
+    # Keeps printing, so only the overall timeout can stop it
+    command = [sys.executable, "-c", "import time\nwhile True:\n    print('working', flush=True)\n    time.sleep(0.05)"]
+    result = gith.run_streaming_command(command, inactivity_timeout=30, echo=False, cwd=str(tmp_path), timeout=1)
+
+    assert result.timed_out
+    assert result.duration < 10
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from conftest import commit_file, run_git, run_gith
+
+
+def init_repo(path, env):
+    run_git(["init", "-q", "-b", "main", path], os.path.dirname(path), env)
+    commit_file(path, env, "file.txt", f"{os.path.basename(path)}\n")
+
+
+@pytest.fixture
+def submodule_repo(tmp_path, gith_env):
+    # top has two submodules, sub_a has its own nested submodule
+    nested = str(tmp_path / "nested")
+    sub_a = str(tmp_path / "sub_a")
+    sub_b = str(tmp_path / "sub_b")
+    top = str(tmp_path / "top")
+    for path in (nested, sub_a, sub_b, top):
+        init_repo(path, gith_env)
+
+    run_git(["submodule", "add", "-q", nested, "nested"], sub_a, gith_env)
+    run_git(["commit", "-q", "-m", "Add nested"], sub_a, gith_env)
+    run_git(["submodule", "add", "-q", sub_a, "sub_a"], top, gith_env)
+    run_git(["submodule", "add", "-q", sub_b, "sub_b"], top, gith_env)
+    run_git(["commit", "-q", "-m", "Add submodules"], top, gith_env)
+    run_git(["submodule", "update", "-q", "--init", "--recursive"], top, gith_env)
+
+    return top
+
+
+@pytest.mark.parametrize("jobs", ["1", "4"])
+def test_clean_nested_submodules(submodule_repo, gith_env, jobs):
+    top = submodule_repo
+    repo_dirs = [top, os.path.join(top, "sub_a"), os.path.join(top, "sub_b"), os.path.join(top, "sub_a", "nested")]
+    for repo_dir in repo_dirs:
+        os.makedirs(os.path.join(repo_dir, "build"))
+        open(os.path.join(repo_dir, "build", "out.o"), "w").close()
+        with open(os.path.join(repo_dir, "file.txt"), "a") as f:
+            f.write("local change\n")
+        run_git(["add", "file.txt"], repo_dir, gith_env)
+
+    result = run_gith(["clean", "full", "--jobs", jobs], top, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+    assert f"Cleaning 3 submodules using {jobs} jobs" in result.stdout
+    for path in ("sub_a", "sub_b", os.path.join("sub_a", "nested")):
+        assert f"Cleaned submodule: {path}" in result.stdout
+
+    # Untracked files and staged changes are gone in the top repo and every submodule, nested ones included
+    for repo_dir in repo_dirs[1:]:
+        assert not os.path.exists(os.path.join(repo_dir, "build"))
+        assert run_git(["status", "--porcelain", "--ignore-submodules"], repo_dir, gith_env) == ""
+    assert not os.path.exists(os.path.join(top, "build"))
+    assert os.path.exists(os.path.join(top, "sub_a", "nested", "file.txt"))
+
+
+def test_clean_reports_failed_submodule(submodule_repo, gith_env):
+    top = submodule_repo
+    open(os.path.join(top, "sub_b", "untracked.txt"), "w").close()
+    # A stale index lock makes restoring the submodule fail
+    git_dir = run_git(["rev-parse", "--absolute-git-dir"], os.path.join(top, "sub_b"), gith_env)
+    open(os.path.join(git_dir, "index.lock"), "w").close()
+
+    result = run_gith(["clean", "full"], top, gith_env)
+    assert "Error: Unable to clean submodule 'sub_b'" in result.stdout
+    assert "Error: 1 of 3 submodules failed to clean" in result.stdout
+    assert "Cleaned submodule: sub_a" in result.stdout
+    assert "Cleaned submodule: sub_a/nested" in result.stdout
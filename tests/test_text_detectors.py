@@ -0,0 +1,89 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+import gith
+from conftest import FakeDetector, FakeFrame, run_gith
+
+
+def test_text_detectors_must_implement_find():
+    class NoFindDetector(gith.TextDetector):
+        name = "none"
+
+    with pytest.raises(TypeError):
+        gith.TextDetector()
+    with pytest.raises(TypeError):
+        NoFindDetector()
+
+
+@pytest.mark.skipif(all(importlib.util.find_spec(module) for module in ("PIL", "pytesseract", "pyscreeze")), reason="OCR modules are installed")
+def test_ocr_bench_names_missing_modules(tmp_path, gith_env):
+    result = run_gith(["ocr-bench", str(tmp_path)], str(tmp_path), gith_env)
+
+    assert "Error: ocr-bench requires Pillow, pytesseract and pyscreeze" in result.stdout
+
+
+class ImageNotFoundException(Exception):
+    pass
+
+
+@pytest.fixture
+def fake_pyscreeze(monkeypatch):
+    # Stands in for pyscreeze, locate matches when the template has the same shade as the frame
+    def locate(template, image, grayscale):
+        if template.shade != image.shade:
+            raise ImageNotFoundException()
+        return (1, 2, template.width, template.height)
+
+    module = types.ModuleType("pyscreeze")
+    module.ImageNotFoundException = ImageNotFoundException
+    module.locate = locate
+    monkeypatch.setitem(sys.modules, "pyscreeze", module)
+    return module
+
+
+def test_template_detector_only_treats_no_match_as_a_miss(tmp_path, fake_pyscreeze):
+    detector = gith.TemplateDetector(str(tmp_path))
+    detector.templates["Build"] = FakeFrame(10, 5, 0)
+
+    assert detector.find(FakeFrame(100, 50, 0), "Build") == (1, 2, 10, 5)
+    assert detector.find(FakeFrame(100, 50, 255), "Build") is None
+
+    def broken_locate(template, image, grayscale):
+        raise ValueError("needle is a different image mode")
+
+    fake_pyscreeze.locate = broken_locate
+    with pytest.raises(ValueError):
+        detector.find(FakeFrame(100, 50, 0), "Build")
+
+
+def test_stale_template_is_replaced(tmp_path, gith_state, fake_pyscreeze):
+    template_detector = gith.TemplateDetector(str(tmp_path / "templates"))
+    template_detector.templates["Build"] = FakeFrame(10, 5, 0)
+    ocr_detector = FakeDetector()
+    watcher = gith.FrameWatcher(lambda region: None, (0, 0, 100, 50), [template_detector, ocr_detector])
+
+    # The saved template was taken before a theme change, so only the slower detector finds the text
+    frame = FakeFrame(100, 50, 255, {"Build": (20, 10, 30, 8)})
+    assert watcher.detect(frame, "Build") == (20, 10, 30, 8)
+    new_template = template_detector.templates["Build"]
+    assert (new_template.width, new_template.height, new_template.shade) == (30, 8, 255)
+    assert os.path.isfile(template_detector.template_path("Build"))
+
+    # The new template matches from then on
+    ocr_detector.searched_sizes.clear()
+    assert watcher.detect(frame, "Build") == (1, 2, 30, 8)
+    assert ocr_detector.searched_sizes == []
+
+
+def test_template_that_was_not_tried_is_kept(tmp_path, gith_state, fake_pyscreeze):
+    template_detector = gith.TemplateDetector(str(tmp_path / "templates"))
+    template = FakeFrame(10, 5, 0)
+    template_detector.templates["Build"] = template
+    watcher = gith.FrameWatcher(lambda region: None, (0, 0, 100, 50), [FakeDetector(), template_detector])
+
+    assert watcher.detect(FakeFrame(100, 50, 255, {"Build": (20, 10, 30, 8)}), "Build") == (20, 10, 30, 8)
+    assert template_detector.templates["Build"] is template
@@ -0,0 +1,45 @@
+import json
+import os
+
+import gith
+from conftest import run_gith
+
+
+def test_timings_trace_and_history(remote_repo, gith_env, tmp_path):
+    _, workspace = remote_repo
+    trace_path = str(tmp_path / "trace.json")
+
+    result = run_gith(["--timings", "--trace", trace_path, "fetch"], workspace, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+    table = result.stdout[result.stdout.index("Step"):]
+    assert "fetch_remote_branch" in table
+    assert "Command total" in table
+
+    with open(trace_path) as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    assert events
+    for event in events:
+        assert event["ph"] == "X"
+        assert event["cat"] in ("step", "subprocess")
+        assert isinstance(event["ts"], int) and event["ts"] >= 0
+        assert isinstance(event["dur"], int) and event["dur"] >= 0
+        assert {"name", "pid", "tid", "args"} <= set(event)
+    # Steps contain the git processes they ran
+    fetch_step = next(event for event in events if event["name"] == "fetch_remote_branch")
+    git_fetches = [event for event in events if event["cat"] == "subprocess" and " fetch " in event["name"]]
+    assert git_fetches
+    assert all(fetch_step["ts"] <= event["ts"] and event["ts"] + event["dur"] <= fetch_step["ts"] + fetch_step["dur"] for event in git_fetches)
+    assert git_fetches[0]["args"]["returncode"] == 0
+
+    # The f alias is recorded under the command's full name, one line per run
+    run_gith(["f"], workspace, gith_env)
+    with open(os.path.join(gith_env["HOME"], ".gith", gith.TIMINGS_HISTORY_FILE)) as f:
+        history = [json.loads(line) for line in f]
+    assert [entry["command"] for entry in history] == ["fetch", "fetch"]
+    assert history[1]["argv"] == "f"
+    assert "fetch_remote_branch" in history[1]["steps"]
+
+    result = run_gith(["timings", "fetch"], workspace, gith_env)
+    assert "Latest: gith f" in result.stdout
+    assert "fetch_remote_branch" in result.stdout
@@ -0,0 +1,53 @@
+import os
+
+from conftest import commit_file, run_git, run_gith
+
+
+def get_config(repo, env, key):
+    return run_git(["config", "--get", key], repo, env)
+
+
+def test_tune_safe_preset(remote_repo, gith_env):
+    _, workspace = remote_repo
+    commit_file(workspace, gith_env, "file.txt", "content\n")
+    # The multi-pack-index is only needed once the repo has packs
+    run_git(["repack", "-q", "-d"], workspace, gith_env)
+
+    result = run_gith(["tune", "safe"], workspace, gith_env)
+    assert "settings are missing, run `gith tune safe apply`" in result.stdout
+    # Reporting only must not change the repo
+    assert not os.path.exists(os.path.join(workspace, ".git", "objects", "info", "commit-graph"))
+    assert "feature.manyfiles" not in run_git(["config", "--list"], workspace, gith_env)
+
+    result = run_gith(["tune", "safe", "apply"], workspace, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+    assert get_config(workspace, gith_env, "fetch.writeCommitGraph") == "true"
+    assert get_config(workspace, gith_env, "feature.manyFiles") == "true"
+    assert get_config(workspace, gith_env, "core.untrackedCache") == "true"
+    assert os.path.exists(os.path.join(workspace, ".git", "objects", "info", "commit-graph"))
+    assert os.path.exists(os.path.join(workspace, ".git", "objects", "pack", "multi-pack-index"))
+    with open(os.path.join(workspace, ".git", "index"), "rb") as index_file:
+        assert int.from_bytes(index_file.read(8)[4:], "big") == 4
+
+    result = run_gith(["tune", "safe"], workspace, gith_env)
+    assert "Everything in the 'safe' preset is already set up" in result.stdout
+
+    # A setting that was turned off again is the only one reported and restored
+    run_git(["config", "--unset", "feature.manyFiles"], workspace, gith_env)
+    result = run_gith(["tune", "safe"], workspace, gith_env)
+    assert "1 settings are missing" in result.stdout
+    assert [line for line in result.stdout.splitlines() if line.endswith("missing")] == [
+        f"{'.':<40} {'feature.manyFiles':<24} missing"
+    ]
+
+    result = run_gith(["tune", "safe", "apply"], workspace, gith_env)
+    assert "Setting up feature.manyFiles in ." in result.stdout
+    assert "Setting up commit-graph" not in result.stdout
+    assert get_config(workspace, gith_env, "feature.manyFiles") == "true"
+
+
+def test_tune_invalid_preset(remote_repo, gith_env):
+    _, workspace = remote_repo
+
+    result = run_gith(["tune", "fast"], workspace, gith_env)
+    assert "Error: 'fast' is not a valid preset, choose between (safe, full)" in result.stdout
@@ -0,0 +1,88 @@
+import gith
+from conftest import FakeClock, FakeDetector, FakeFrame
+
+SCREEN_SIZE = (800, 600)
+SOLUTION = "C:/build/minecraftpe.sln"
+
+
+class SimulatedVisualStudio:
+    # Stands in for PyAutoGuiBackend: each action shows its scripted frames, one per screenshot, or else a new blank frame
+    def __init__(self, clock, script):
+        self.clock = clock
+        self.script = script
+        self.actions = []
+        self.frame_count = 0
+        self.frames = [self.next_frame()]
+        self.exit_time = None
+
+    def next_frame(self, texts=None):
+        self.frame_count += 1
+        return FakeFrame(*SCREEN_SIZE, (self.frame_count % 15 + 1) * 16, texts)
+
+    def act(self, action):
+        self.actions.append(action)
+        self.frames = list(self.script.get(action, [])) or [self.next_frame()]
+
+    def screen_size(self):
+        return SCREEN_SIZE
+
+    def screenshot(self, region=None):
+        return self.frames.pop(0) if len(self.frames) > 1 else self.frames[0]
+
+    def move_to(self, x, y):
+        self.act(f"move {x:.0f},{y:.0f}")
+
+    def hotkey(self, key):
+        self.act(f"hotkey {key}")
+
+    def press(self, key):
+        self.act(f"press {key}")
+
+    def open_file(self, path):
+        self.act(f"open {path}")
+
+    def close_visual_studio(self):
+        self.act("close")
+        self.exit_time = self.clock.now + 0.25
+
+    def visual_studio_running(self):
+        return self.exit_time is None or self.clock.now < self.exit_time
+
+
+def run_simulated_build(monkeypatch, menu_texts):
+    clock = FakeClock()
+    monkeypatch.setattr(gith, "time", clock)
+
+    loading = FakeFrame(*SCREEN_SIZE, 32)
+    loaded = FakeFrame(*SCREEN_SIZE, 64, {"Debugger": (300, 5, 60, 12)})
+    build_menu = FakeFrame(*SCREEN_SIZE, 96, {text: (40, 30 + index * 20, 60, 12) for index, text in enumerate(menu_texts)})
+    backend = SimulatedVisualStudio(clock, {f"open {SOLUTION}": [loading, loading, loading, loaded], "hotkey b": [build_menu]})
+
+    watcher = gith.FrameWatcher(backend.screenshot, (0, 0, *SCREEN_SIZE), [FakeDetector()])
+    step_timings = gith.run_vs_build_steps(gith.VS_BUILD_STEPS, backend, watcher, SOLUTION)
+    return backend.actions, dict(step_timings)
+
+
+def test_distributed_build_steps(gith_state, monkeypatch):
+    actions, step_timings = run_simulated_build(monkeypatch, ["Compile", "Distributed"])
+
+    assert actions == (["close", f"open {SOLUTION}", "move 400,540"]
+                       + ["hotkey alt", "hotkey b"] + ["press up"] * 3 + ["press enter", "press down", "press down"] + ["press escape"] * 3
+                       + ["hotkey alt", "hotkey b"] + ["press down"] * 3 + ["press enter"])
+
+    # Visual Studio exits on the poll after 0.25s, the solution loads on the fourth frame after backing off 0.2 + 0.4 + 0.8s
+    assert round(step_timings["Close Visual Studio"], 2) == 0.3
+    assert round(step_timings["Wait for the solution to load"], 2) == 1.4
+    # Texts already on screen are found without waiting, keystrokes only wait for the frame to change and settle
+    assert step_timings["Look for Compile"] == step_timings["Look for Distributed"] == 0
+    assert round(step_timings["Open Build menu"], 2) == 0.03
+
+
+def test_build_steps_without_distributed_build(gith_state, monkeypatch):
+    actions, step_timings = run_simulated_build(monkeypatch, [])
+
+    # The Compile and Distributed steps are skipped, the build starts from the top of the Build menu
+    assert actions.count("press up") == 1
+    assert actions[-2:] == ["hotkey b", "press enter"]
+    assert 2 < step_timings["Look for Compile"] <= 3
+    assert 2 < step_timings["Look for Distributed"] <= 3
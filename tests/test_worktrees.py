@@ -0,0 +1,37 @@
+import os
+
+from conftest import commit_file, run_git, run_gith
+
+
+def test_worktree_branches(remote_repo, gith_env):
+    upstream, workspace = remote_repo
+    latest_sha = commit_file(upstream, gith_env, "file.txt", "upstream\n")
+    run_git(["push", "-q", "origin", "main"], upstream, gith_env)
+
+    # Untracked build output in the main checkout must survive branching
+    os.makedirs(os.path.join(workspace, "build"))
+    open(os.path.join(workspace, "build", "out.o"), "w").close()
+    assert run_gith(["option", "branch_mode", "worktree"], workspace, gith_env).returncode == 0
+
+    result = run_gith(["branch", "feature/one"], workspace, gith_env)
+    assert "Error:" not in result.stdout, result.stdout
+
+    worktree_path = os.path.join(workspace + "-worktrees", "feature-one")
+    assert run_git(["rev-parse", "--abbrev-ref", "HEAD"], worktree_path, gith_env) == "feature/one"
+    assert run_git(["rev-parse", "HEAD"], worktree_path, gith_env) == latest_sha
+    assert run_git(["rev-parse", "--abbrev-ref", "HEAD"], workspace, gith_env) == "main"
+    assert os.path.exists(os.path.join(workspace, "build", "out.o"))
+
+    # A second branch command switches to the existing worktree without touching it
+    open(os.path.join(worktree_path, "work.txt"), "w").close()
+    result = run_gith(["branch", "feature/one"], workspace, gith_env)
+    assert "Branch 'feature/one' already has a worktree" in result.stdout
+    assert os.path.exists(os.path.join(worktree_path, "work.txt"))
+
+    listing = run_gith(["worktree", "list"], workspace, gith_env).stdout.splitlines()
+    assert f"main: {workspace}" in listing
+    assert f"feature/one: {worktree_path}" in listing
+
+    result = run_gith(["worktree", "remove", "feature/one"], workspace, gith_env)
+    assert "Removed worktree for branch 'feature/one'" in result.stdout
+    assert not os.path.exists(worktree_path)